@@ -0,0 +1,77 @@
+"""
+解析函式的微型效能測試：以 fixtures 中的人數欄位、備註與詳細資訊文字，
+比較 course_parser 與舊版逐一嘗試未編譯樣式的實作，並確認兩者結果一致
+
+用法：
+    python bench/bench_parser.py --repeat 2000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from course_parser import parse_enrolled, parse_remark_cap, parse_detail_cap
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "parser_fixtures.json")
+
+def legacy_enrolled(text):
+    numbers = re.findall(r'\d+', text)
+    return int(numbers[1]) if len(numbers) > 1 else None
+
+def legacy_remark_cap(text):
+    if not text:
+        return None
+    patterns = [r'限制(\d+)人', r'限(\d+)人', r'上限(\d+)人', r'最多(\d+)人', r'(\d{2,3})人', r'／限(\d+)人']
+    for pattern in patterns:
+        for match in re.findall(pattern, text):
+            number = int(match)
+            if 5 <= number <= 200:
+                return number
+    return None
+
+def legacy_detail_cap(text):
+    """舊版瀏覽器端的樣式，在整份文字上依序嘗試"""
+    match = re.search(r'本校加退選人數上限[^：]*：\s*(\d+)', text)
+    if match:
+        return int(match.group(1))
+    for pattern in (r'加退選人數上限[^：]*：\s*(\d+)', r'選課人數上限[^：]*：\s*(\d+)',
+                    r'人數上限[^：]*：\s*(\d+)', r'上限[^：]*：\s*(\d+)'):
+        match = re.search(pattern, text)
+        if match and 5 <= int(match.group(1)) <= 200:
+            return int(match.group(1))
+    return None
+
+CASES = (
+    ("enrollment", legacy_enrolled, parse_enrolled),
+    ("remarks", legacy_remark_cap, parse_remark_cap),
+    ("dialogs", legacy_detail_cap, parse_detail_cap),
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="course_parser 微型效能測試")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        fixtures = json.load(f)
+
+    for name, legacy, current in CASES:
+        texts = fixtures[name]
+        mismatches = [(text, legacy(text), current(text)) for text in texts if legacy(text) != current(text)]
+        legacy_time = timeit.timeit(lambda: [legacy(text) for text in texts], number=args.repeat)
+        current_time = timeit.timeit(lambda: [current(text) for text in texts], number=args.repeat)
+        calls = len(texts) * args.repeat
+        print(
+            f"{name}: 舊版 {legacy_time / calls * 1e6:.2f}µs/次，新版 {current_time / calls * 1e6:.2f}µs/次 "
+            f"({legacy_time / current_time:.1f}x)"
+        )
+        for text, expected, actual in mismatches:
+            print(f"  ⚠️ 結果不同: {text!r} 舊版 {expected} 新版 {actual}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+離線重播效能測試：以本機模擬的 querycourse 伺服器與假的 Discord 頻道驅動機器人的輪詢、通知與 /add 流程
+
+用法：
+    python bench/run_bench.py --courses 10 100 1000 --duration 30
+    python bench/run_bench.py --backend playwright --courses 10 --output bench_output.txt
+
+回報每秒查詢次數、名額釋出到送出通知的延遲、RSS 峰值、Chromium 行程數與事件迴圈延遲
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stub_server import StubCourseServer
+
+class FakeChannel:
+    def __init__(self, channel_id, sink):
+        self.id = channel_id
+        self.name = f"bench-{channel_id}"
+        self.sink = sink
+
+    async def send(self, message=None, **kwargs):
+        self.sink.messages.append((time.time(), self.id, message or ""))
+
+class FakeChannelSink:
+    """收集機器人送出的所有訊息"""
+
+    def __init__(self):
+        self.messages = []
+        self.channels = {}
+
+    def get_channel(self, channel_id):
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, self)
+        return self.channels[channel_id]
+
+    def first_mention_of(self, course_code):
+        for sent_at, _, message in self.messages:
+            if course_code in message and "有名額" in message:
+                return sent_at
+        return None
+
+def chromium_processes():
+    """回傳 (Chromium 行程數, 這些行程的 RSS 總和 KB)"""
+    count = 0
+    rss = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().lower()
+            if b"chrom" not in cmdline:
+                continue
+            count += 1
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss += int(line.split()[1])
+        except OSError:
+            continue
+    return count, rss
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+def reset_bot_state(bot_main, sink, server, base_url, guilds):
+    """以模擬資料重設機器人的全域狀態"""
+    from notifier import NotificationDispatcher
+
+    bot_main.course_api.base_url = base_url + "/api"
+    bot_main.course_api.semester = None
+    bot_main.QUERY_URL = base_url + "/#/"
+    bot_main.course_cache.path = None
+    bot_main.course_cache.entries.clear()
+    bot_main.change_detector.last.clear()
+    bot_main.poll_scheduler.courses.clear()
+    for key in bot_main.poll_scheduler.stats:
+        bot_main.poll_scheduler.stats[key] = 0
+    bot_main.notifier = NotificationDispatcher(sink.get_channel, tick=bot_main.NOTIFY_TICK, min_send_interval=0)
+
+    tracked = {}
+    for code, course in server.courses.items():
+        index = course["index"]
+        guild_ids = {index % guilds}
+        if index % 3 == 0:
+            guild_ids.add((index + 1) % guilds)
+        for guild_id in guild_ids:
+            tracked.setdefault(guild_id, {})[code] = {
+                "name": "", "teacher": "", "lesson_time": "", "classroom": "", "remark": "",
+                "notified": False, "followers": {1000 + index, 2000 + guild_id},
+                "enrolled_students": None, "max_students": server.capacity,
+            }
+    bot_main.tracked_courses = tracked
+    bot_main.subscription_index.rebuild(tracked)
+    bot_main.guild_channels = {guild_id: 10000 + guild_id for guild_id in range(guilds)}
+
+async def run_scenario(bot_main, count, args):
+    from metrics import LoopLagMonitor
+
+    server = StubCourseServer(count, open_after=args.duration * 0.2, open_before=args.duration * 0.8,
+                              latency=args.server_latency)
+    base_url = await server.start()
+    sink = FakeChannelSink()
+    reset_bot_state(bot_main, sink, server, base_url, args.guilds)
+
+    playwright = None
+    if args.backend == "playwright":
+        from playwright.async_api import async_playwright
+        from page_pool import PagePool
+        playwright = await async_playwright().start()
+        bot_main.playwright_browser = await playwright.chromium.launch(headless=True)
+        bot_main.playwright_context = await bot_main.playwright_browser.new_context()
+        bot_main.page_pool = PagePool(bot_main.playwright_context, bot_main.PAGE_POOL_SIZE, bot_main.PAGE_JOB_TIMEOUT)
+        await bot_main.page_pool.start()
+        bot_main.browser_ready.set()
+
+    rows_seen = 0
+    original_search = bot_main.poll_scheduler.search
+
+    async def counting_search(keyword):
+        nonlocal rows_seen
+        rows = await original_search(keyword)
+        rows_seen += len(rows)
+        return rows
+
+    bot_main.poll_scheduler.search = counting_search
+    lag = LoopLagMonitor()
+    lag.histogram.samples.clear()
+    peak_chromium = (0, 0)
+
+    async def sample_processes():
+        nonlocal peak_chromium
+        while True:
+            current = chromium_processes()
+            peak_chromium = max(peak_chromium, current)
+            await asyncio.sleep(0.5)
+
+    tasks = [
+        asyncio.create_task(lag.run()),
+        asyncio.create_task(sample_processes()),
+        asyncio.create_task(bot_main.poll_scheduler.run()),
+        asyncio.create_task(bot_main.notifier.run()),
+    ]
+    server.started_at = time.time()
+    await asyncio.sleep(args.duration)
+
+    # 定期提醒：整理所有已通知課程並排入佇列所需的時間
+    start = time.perf_counter()
+    await bot_main.periodic_notify.coro()
+    periodic_seconds = time.perf_counter() - start
+
+    for task in tasks[2:]:
+        task.cancel()
+    await asyncio.gather(*tasks[2:], return_exceptions=True)
+    bot_main.poll_scheduler.search = original_search
+    bot_main.notifier.flush()
+    await asyncio.sleep(0.2)
+    poll_requests = server.requests
+
+    # /add：快取未命中時的完整查詢流程
+    add_latencies = []
+    for code in list(server.courses)[:args.adds]:
+        bot_main.course_cache.entries.clear()
+        start = time.perf_counter()
+        await bot_main.add_pipeline(code, 0)
+        add_latencies.append(time.perf_counter() - start)
+
+    for task in tasks[:2]:
+        task.cancel()
+    await asyncio.gather(*tasks[:2], return_exceptions=True)
+
+    latencies = []
+    missed = 0
+    for code, course in server.courses.items():
+        opens_at = course["opens_at"]
+        if opens_at is None or opens_at > args.duration:
+            continue
+        notified_at = sink.first_mention_of(code)
+        if notified_at is None:
+            missed += 1
+        else:
+            latencies.append(notified_at - (server.started_at + opens_at))
+
+    if playwright:
+        await bot_main.page_pool.close()
+        await bot_main.playwright_browser.close()
+        await playwright.stop()
+    await bot_main.course_api.close()
+    await server.stop()
+
+    subscriptions = sum(len(courses) for courses in bot_main.tracked_courses.values())
+    return {
+        "backend": args.backend,
+        "courses": count,
+        "subscriptions": subscriptions,
+        "duration": args.duration,
+        "requests": poll_requests,
+        "polls_per_sec": poll_requests / args.duration,
+        "rows_per_sec": rows_seen / args.duration,
+        "saved_requests": bot_main.poll_scheduler.stats["saved_requests"],
+        "notify_p50": percentile(latencies, 50),
+        "notify_p99": percentile(latencies, 99),
+        "notify_missed": missed,
+        "messages_sent": len(sink.messages),
+        "periodic_notify_seconds": periodic_seconds,
+        "add_p50": percentile(add_latencies, 50),
+        "add_p99": percentile(add_latencies, 99),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "chromium_processes": peak_chromium[0],
+        "chromium_rss_mb": peak_chromium[1] / 1024,
+        "loop_lag_p99": lag.histogram.percentile(99),
+        "loop_lag_max": lag.peak,
+    }
+
+def format_result(result):
+    def seconds(value):
+        return "-" if value is None else f"{value:.3f}s"
+    return (
+        f"[{result['backend']}] {result['courses']} 門課程 / {result['subscriptions']} 個訂閱 / {result['duration']}s\n"
+        f"  查詢: {result['requests']} 次 ({result['polls_per_sec']:.2f}/s)，課程資料列 {result['rows_per_sec']:.1f}/s，節省 {result['saved_requests']} 次\n"
+        f"  名額釋出→通知: p50 {seconds(result['notify_p50'])} p99 {seconds(result['notify_p99'])}，漏失 {result['notify_missed']}，送出 {result['messages_sent']} 則訊息\n"
+        f"  定期提醒: {seconds(result['periodic_notify_seconds'])}，/add: p50 {seconds(result['add_p50'])} p99 {seconds(result['add_p99'])}\n"
+        f"  RSS 峰值: {result['peak_rss_mb']:.1f} MB，Chromium: {result['chromium_processes']} 個行程 / {result['chromium_rss_mb']:.1f} MB\n"
+        f"  事件迴圈延遲: p99 {seconds(result['loop_lag_p99'])} 最大 {seconds(result['loop_lag_max'])}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description="NTUST Course Scraper Bot 離線效能測試")
+    parser.add_argument("--courses", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--adds", type=int, default=5)
+    parser.add_argument("--backend", choices=["api", "playwright"], default="api")
+    parser.add_argument("--server-latency", type=float, default=0.05)
+    parser.add_argument("--output", help="將結果以 JSON 寫入檔案，作為回歸比較的基準")
+    args = parser.parse_args()
+
+    # 必須在載入 discord_bot 之前設定，輪詢排程器會依後端決定批次查詢與併發數
+    os.environ["FETCH_BACKEND"] = args.backend
+    os.environ.setdefault("COURSE_SEMESTER", "")
+    import discord_bot as bot_main
+
+    results = []
+    for count in args.courses:
+        result = await run_scenario(bot_main, count, args)
+        print(format_result(result), flush=True)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
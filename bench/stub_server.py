@@ -0,0 +1,133 @@
+"""
+本機模擬的 querycourse 伺服器，供效能測試使用
+提供查詢頁面（/querycourse/）與搜尋 API（/querycourse/api/courses），
+課程一開始都是額滿，依腳本在指定時間釋出名額，並記錄釋出時間供計算通知延遲
+"""
+import asyncio
+import random
+import time
+from aiohttp import web
+
+SEMESTER = "bench"
+
+QUERY_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>querycourse stub</title></head>
+<body>
+<input type="text" id="keyword">
+<div class="v-datatable"><table><tbody id="rows"></tbody></table></div>
+<div id="dialog"></div>
+<script>
+const input = document.getElementById("keyword");
+input.addEventListener("keydown", async (event) => {
+    if (event.key !== "Enter") return;
+    const resp = await fetch("api/courses", {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({Semester: "bench", CourseNo: input.value})
+    });
+    const data = await resp.json();
+    const tbody = document.getElementById("rows");
+    tbody.innerHTML = "";
+    if (!data.length) {
+        tbody.innerHTML = "<tr><td>無資料</td></tr>";
+        return;
+    }
+    for (const item of data) {
+        const tr = document.createElement("tr");
+        const cols = [item.CourseNo, "", item.CourseName, "", "", "", item.CourseTeacher,
+            `${item.Restrict1} / ${item.ChooseStudent}`, item.Node, item.ClassRoomNo, item.Contents];
+        for (const value of cols) {
+            const td = document.createElement("td");
+            td.innerText = value;
+            tr.appendChild(td);
+        }
+        const more = document.createElement("i");
+        more.className = "material-icons";
+        more.innerText = "more_horiz";
+        more.onclick = () => {
+            document.getElementById("dialog").innerHTML =
+                `<div class="v-dialog--active">本校加退選人數上限：${item.Restrict1}</div>`;
+        };
+        tr.appendChild(more);
+        tbody.appendChild(tr);
+    }
+});
+</script>
+</body></html>
+"""
+
+class StubCourseServer:
+    """
+    模擬的課程資料：count 門課程，每門上限 capacity 人，一開始額滿
+    open_ratio 比例的課程會在 [open_after, open_before] 秒之間隨機釋出一個名額
+    """
+
+    def __init__(self, count, capacity=50, open_ratio=0.5, open_after=5, open_before=25,
+                 latency=0.0, seed=0):
+        self.capacity = capacity
+        self.latency = latency
+        self.started_at = time.time()
+        rng = random.Random(seed)
+        departments = ["CS", "EE", "ME", "CH", "CT", "AT", "MA", "PE", "FL", "GE", "MI", "IM"]
+        self.courses = {}
+        for index in range(count):
+            code = f"{departments[index % len(departments)]}{1000000 + index:07d}"
+            opens_at = rng.uniform(open_after, open_before) if rng.random() < open_ratio else None
+            self.courses[code] = {"index": index, "opens_at": opens_at}
+        self.requests = 0
+        self.opened = {}
+
+    def enrolled(self, code, now):
+        opens_at = self.courses[code]["opens_at"]
+        if opens_at is not None and now - self.started_at >= opens_at:
+            self.opened.setdefault(code, self.started_at + opens_at)
+            return self.capacity - 1
+        return self.capacity
+
+    def row(self, code, now):
+        return {
+            "Semester": SEMESTER,
+            "CourseNo": code,
+            "CourseName": f"模擬課程 {self.courses[code]['index']}",
+            "CourseTeacher": "測試教師",
+            "ChooseStudent": self.enrolled(code, now),
+            "Restrict1": str(self.capacity),
+            "Node": "M2,M3",
+            "ClassRoomNo": "TR-313",
+            "Contents": f"限{self.capacity}人",
+        }
+
+    async def handle_courses(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = await request.json()
+        keyword = body.get("CourseNo", "")
+        now = time.time()
+        return web.json_response([self.row(code, now) for code in self.courses if code.startswith(keyword)])
+
+    async def handle_semesters(self, request):
+        return web.json_response([{"Semester": SEMESTER}])
+
+    async def handle_page(self, request):
+        return web.Response(text=QUERY_PAGE, content_type="text/html")
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get("/querycourse/", self.handle_page)
+        app.router.add_post("/querycourse/api/courses", self.handle_courses)
+        app.router.add_get("/querycourse/api/semestersinfo", self.handle_semesters)
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """啟動伺服器並回傳實際的 base URL"""
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.started_at = time.time()
+        return f"http://{host}:{port}/querycourse"
+
+    async def stop(self):
+        await self.runner.cleanup()
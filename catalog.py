@@ -0,0 +1,173 @@
+import asyncio
+import bisect
+import json
+import os
+import time
+from course_parser import parse_remark_cap
+from utils import debug_print
+
+CATALOG_FIELDS = ("course_code", "course_name", "teacher_name", "lesson_time", "classroom", "max_students")
+
+def catalog_entry(row):
+    """只保留目錄需要的欄位，沒有上限時以備註推算"""
+    entry = {name: row.get(name) for name in CATALOG_FIELDS}
+    if entry["max_students"] is None:
+        entry["max_students"] = parse_remark_cap(row.get("remark_text"))
+    return entry
+
+def _search_text(entry):
+    return " ".join(str(entry[name] or "") for name in CATALOG_FIELDS[:5]).lower()
+
+def _grams(text):
+    """單字元與雙字元片段，查詢字串的每個片段都必須出現在課程的文字中"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+def _query_grams(needle):
+    return {needle[i:i + 2] for i in range(len(needle) - 1)} or set(needle)
+
+class CourseCatalog:
+    """
+    整學期的課程目錄快照，常駐記憶體供 /search 與 /add 的自動完成使用
+    課程代碼以排序後的列表做前綴查詢；名稱、教師、時間與教室以單字元與雙字元索引做子字串查詢。
+    定期以整學期搜尋更新，只重建有變動的課程索引，並存成 JSON 以便重啟後立即可用
+    """
+
+    def __init__(self, path="catalog.json", refresh_interval=3600):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.semester = None
+        self.updated_at = 0
+        self.entries = {}
+        self._codes = []
+        self._texts = {}
+        self._grams = {}
+        self.stats = {"refreshes": 0, "added": 0, "updated": 0, "removed": 0, "lookups": 0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, course_code):
+        return self.entries.get(course_code)
+
+    def _index(self, entry):
+        code = entry["course_code"]
+        self.entries[code] = entry
+        bisect.insort(self._codes, code)
+        text = _search_text(entry)
+        self._texts[code] = text
+        for gram in _grams(text):
+            self._grams.setdefault(gram, set()).add(code)
+
+    def _unindex(self, code):
+        del self.entries[code]
+        del self._codes[bisect.bisect_left(self._codes, code)]
+        for gram in _grams(self._texts.pop(code)):
+            codes = self._grams.get(gram)
+            if codes is not None:
+                codes.discard(code)
+                if not codes:
+                    del self._grams[gram]
+
+    def apply(self, rows, semester=None):
+        """以完整的課程列表更新目錄，只重新索引新增、變動或移除的課程，回傳是否有變動"""
+        if semester != self.semester:
+            for code in list(self.entries):
+                self._unindex(code)
+            self.semester = semester
+        latest = {}
+        for row in rows:
+            if row.get("course_code"):
+                latest[row["course_code"]] = catalog_entry(row)
+
+        added = updated = removed = 0
+        for code in list(self.entries):
+            if code not in latest:
+                self._unindex(code)
+                removed += 1
+        for code, entry in latest.items():
+            current = self.entries.get(code)
+            if current == entry:
+                continue
+            if current is None:
+                added += 1
+            else:
+                self._unindex(code)
+                updated += 1
+            self._index(entry)
+
+        self.updated_at = time.time()
+        self.stats["added"] += added
+        self.stats["updated"] += updated
+        self.stats["removed"] += removed
+        debug_print(f"📚 課程目錄已更新：共 {len(self.entries)} 門，新增 {added}、變動 {updated}、移除 {removed}")
+        return bool(added or updated or removed)
+
+    def lookup(self, query, limit=25):
+        """依序回傳代碼完全相符、代碼前綴相符、其他欄位包含查詢字串的課程"""
+        self.stats["lookups"] += 1
+        query = (query or "").strip()
+        if not query:
+            return [self.entries[code] for code in self._codes[:limit]]
+
+        results = []
+        seen = set()
+        upper = query.upper()
+        start = bisect.bisect_left(self._codes, upper)
+        for code in self._codes[start:]:
+            if not code.startswith(upper) or len(results) >= limit:
+                break
+            results.append(self.entries[code])
+            seen.add(code)
+        if len(results) >= limit:
+            return results
+
+        needle = query.lower()
+        postings = sorted((self._grams.get(gram, set()) for gram in _query_grams(needle)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        for code in self._codes:
+            if code not in candidates or code in seen or needle not in self._texts[code]:
+                continue
+            results.append(self.entries[code])
+            if len(results) >= limit:
+                break
+        return results
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            debug_print(f"⚠️ 讀取課程目錄失敗，將重新下載: {e}")
+            return
+        self.apply(data.get("entries", []), data.get("semester"))
+        self.updated_at = data.get("updated_at", 0)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"semester": self.semester, "updated_at": self.updated_at, "entries": list(self.entries.values())}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def refresh(self, search, semester=None):
+        rows = await search("")
+        self.stats["refreshes"] += 1
+        if self.apply(rows, semester):
+            await asyncio.to_thread(self.save)
+
+    async def run(self, search, get_semester):
+        """定期下載整學期課程；快照仍在有效期內時延後到期再更新"""
+        debug_print("📚 課程目錄更新已啟動")
+        while True:
+            wait = self.updated_at + self.refresh_interval - time.time()
+            if self.entries and wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await self.refresh(search, await get_semester())
+            except Exception as e:
+                debug_print(f"❌ 更新課程目錄時發生錯誤：{type(e).__name__}: {e}")
+                await asyncio.sleep(min(self.refresh_interval, 300))
@@ -0,0 +1,83 @@
+import aiohttp
+from course_parser import parse_int
+from utils import debug_print
+
+API_BASE_URL = "https://querycourse.ntust.edu.tw/querycourse/api"
+
+def normalize_api_row(item):
+    """將後端 API 回傳的課程資料轉為與網頁表格相同的欄位"""
+    enrolled = parse_int(item.get("ChooseStudent"))
+    maximum = parse_int(item.get("Restrict1"))
+    return {
+        "course_code": (item.get("CourseNo") or "").strip(),
+        "course_name": (item.get("CourseName") or "").strip(),
+        "teacher_name": (item.get("CourseTeacher") or "").strip(),
+        # 與網頁表格的人數欄位相同，為「上限 / 已選人數」
+        "enrollment_text": f"{maximum} / {enrolled}",
+        "lesson_time": (item.get("Node") or "").strip(),
+        "classroom": (item.get("ClassRoomNo") or "").strip(),
+        "remark_text": (item.get("Contents") or "").strip(),
+        "enrolled_students": enrolled,
+        "max_students": maximum,
+    }
+
+class CourseApiClient:
+    """
+    直接呼叫 querycourse 後端搜尋 API 的客戶端
+    共用同一個 aiohttp session（連線池），不需要開啟瀏覽器頁面
+    """
+
+    def __init__(self, base_url=API_BASE_URL, semester=None, timeout=15, pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.semester = semester
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = None
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def get_semester(self):
+        """取得目前學期代碼，未指定時以 semestersinfo 的第一筆為準"""
+        if self.semester:
+            return self.semester
+        await self.start()
+        async with self.session.get(f"{self.base_url}/semestersinfo") as resp:
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+        self.semester = data[0]["Semester"]
+        debug_print(f"📅 目前學期: {self.semester}")
+        return self.semester
+
+    async def search(self, keyword):
+        """以課程代碼（可為前綴或空字串）搜尋，回傳正規化後的課程列表"""
+        await self.start()
+        payload = {
+            "Semester": await self.get_semester(),
+            "CourseNo": keyword,
+            "CourseName": "",
+            "CourseTeacher": "",
+            "Dimension": "",
+            "CourseNotes": "",
+            "ForeignLanguage": 0,
+            "OnlyGeneral": 0,
+            "OnleyNTUST": 0,
+            "OnlyMaster": 0,
+            "OnlyUnderGraduate": 0,
+            "OnlyNode": 0,
+            "Language": "zh",
+        }
+        async with self.session.post(f"{self.base_url}/courses", json=payload) as resp:
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+        return [normalize_api_row(item) for item in data or []]
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from utils import debug_print
+
+CACHE_FIELDS = ("max_students", "name", "teacher", "lesson_time", "classroom")
+
+class CourseCache:
+    """
+    課程資料快取（人數上限、名稱、教師、時間、教室），以 學期:課程代碼 為鍵
+    具有 TTL 與 LRU 淘汰，並儲存到 JSON 檔案以便重啟後沿用；
+    更新只標記為待寫入，由 run 每 flush_interval 秒在背景執行緒寫檔一次
+    """
+
+    def __init__(self, path="course_cache.json", ttl=6 * 3600, max_entries=2000, flush_interval=30):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.entries = OrderedDict()
+        self.dirty = False
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(semester, course_code):
+        return f"{semester}:{course_code}"
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            debug_print(f"⚠️ 讀取課程快取失敗，將重新建立: {e}")
+            return
+        now = time.time()
+        for key, entry in data.items():
+            if now - entry.get("updated_at", 0) < self.ttl:
+                self.entries[key] = entry
+        self._evict()
+        debug_print(f"📦 已載入 {len(self.entries)} 筆課程快取")
+
+    def save(self, entries=None):
+        """寫入暫存檔後再取代原檔，寫到一半中斷也不會留下損毀的快取"""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries if entries is None else entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def flush(self):
+        """有未寫入的變更時，以目前內容的複本在背景執行緒寫檔"""
+        if not self.dirty:
+            return
+        self.dirty = False
+        try:
+            await asyncio.to_thread(self.save, dict(self.entries))
+        except Exception:
+            self.dirty = True
+            raise
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                debug_print(f"⚠️ 寫入課程快取失敗: {e}")
+
+    def get(self, semester, course_code):
+        """取得未過期的快取資料，未命中時回傳 None"""
+        key = self.make_key(semester, course_code)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if time.time() - entry["updated_at"] >= self.ttl:
+            del self.entries[key]
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, semester, course_code, fields):
+        """
+        更新快取資料，值為 None 的欄位保留原本的值
+        只有內容改變（或即將過期）時才標記為待寫入，回傳是否有變更
+        """
+        key = self.make_key(semester, course_code)
+        entry = self.entries.get(key, {})
+        updated = {
+            field: fields[field] if fields.get(field) is not None else entry.get(field)
+            for field in CACHE_FIELDS
+        }
+        changed = any(updated[field] != entry.get(field) for field in CACHE_FIELDS)
+        if not changed and key in self.entries and time.time() - entry["updated_at"] < self.ttl / 2:
+            self.entries.move_to_end(key)
+            return False
+        updated["updated_at"] = time.time()
+        self.entries[key] = updated
+        self.entries.move_to_end(key)
+        self._evict()
+        self.dirty = True
+        return changed
+
+    def touch(self, semester, course_code):
+        """
+        輪詢確認資料沒有變化時延長有效期限，過了一半 TTL 才標記為待寫入
+        回傳快取中是否有這筆資料
+        """
+        key = self.make_key(semester, course_code)
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        self.entries.move_to_end(key)
+        if time.time() - entry["updated_at"] >= self.ttl / 2:
+            entry["updated_at"] = time.time()
+            self.dirty = True
+        return True
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
@@ -0,0 +1,18 @@
+from course_api import normalize_api_row
+from readiness import load_query_page, submit_search
+
+async def open_query_page(page, url, course_code):
+    """載入查詢網站並搜尋指定課程代碼，回傳搜尋 API 的 JSON"""
+    await load_query_page(page, url)
+    return await submit_search(page, course_code, timeout=30000)
+
+async def search_on_page(page, url, keyword):
+    """
+    在頁面上搜尋課程，頁面尚未載入查詢網站時先載入
+    資料列取自這次搜尋的 API 回應，而非表格，關鍵字與上次相同時也不會讀到舊的結果
+    """
+    if not page.url.startswith(url.split("#")[0]):
+        data = await open_query_page(page, url, keyword)
+    else:
+        data = await submit_search(page, keyword)
+    return [normalize_api_row(item) for item in data]
@@ -0,0 +1,66 @@
+import re
+
+# 所有樣式在載入時編譯一次，每個欄位只掃描文字一遍
+DIGITS = re.compile(r'\d+')
+# 人數欄位為「上限 / 已選人數」，取第二個數字
+ENROLLMENT = re.compile(r'\d+\D+(\d+)')
+# 備註中的人數上限，前綴依原本逐一嘗試的優先順序排名（「上限N人」同時符合「限N人」，因此同級）
+REMARK_CAP = re.compile(r'(限制|上限|限|最多)?(\d+)人')
+REMARK_PREFIX_RANK = {"限制": 0, "限": 1, "上限": 1, "最多": 2, None: 3}
+# 詳細資訊視窗中的人數上限，本校加退選人數上限優先且不做合理性檢查
+DETAIL_CAP = re.compile(r'(本校加退選人數上限|加退選人數上限|選課人數上限|人數上限|上限)[^：]*：\s*(\d+)')
+DETAIL_LABEL_RANK = {"本校加退選人數上限": 0, "加退選人數上限": 1, "選課人數上限": 2, "人數上限": 3, "上限": 4}
+
+MIN_CAP = 5
+MAX_CAP = 200
+
+def is_reasonable_cap(number):
+    return MIN_CAP <= number <= MAX_CAP
+
+def parse_int(value):
+    """取出文字中的第一個整數，沒有數字時回傳 None"""
+    if value is None:
+        return None
+    match = DIGITS.search(str(value))
+    return int(match.group()) if match else None
+
+def parse_enrolled(text):
+    """從表格人數欄位（例如 "50 / 48"）取出已選人數"""
+    match = ENROLLMENT.search(text or "")
+    return int(match.group(1)) if match else None
+
+def parse_remark_cap(text):
+    """從備註文字提取人數上限，例如「限40人」、「上限40人」、「最多40人」"""
+    if not text:
+        return None
+    best = None
+    for match in REMARK_CAP.finditer(text):
+        prefix, digits = match.groups()
+        if prefix is None and not 2 <= len(digits) <= 3:
+            continue
+        number = int(digits)
+        if not is_reasonable_cap(number):
+            continue
+        rank = REMARK_PREFIX_RANK[prefix]
+        if best is None or rank < best[0]:
+            best = (rank, number)
+            if rank == 0:
+                break
+    return best[1] if best else None
+
+def parse_detail_cap(text):
+    """從詳細資訊視窗的文字提取人數上限"""
+    if not text:
+        return None
+    best = None
+    for match in DETAIL_CAP.finditer(text):
+        label, digits = match.groups()
+        number = int(digits)
+        rank = DETAIL_LABEL_RANK[label]
+        if rank > 0 and not is_reasonable_cap(number):
+            continue
+        if best is None or rank < best[0]:
+            best = (rank, number)
+            if rank == 0:
+                break
+    return best[1] if best else None
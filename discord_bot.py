@@ -0,0 +1,1008 @@
+import discord
+from discord import app_commands
+from discord.ext import commands, tasks
+import asyncio
+import datetime
+import hashlib
+import json
+import multiprocessing
+import time
+from dotenv import load_dotenv
+import os
+from playwright.async_api import async_playwright
+from course_api import CourseApiClient, API_BASE_URL
+from poll_scheduler import PollScheduler, parse_selection_windows
+from sharding import ShardCoordinator
+from supervisor import Supervisor
+from page_pool import PagePool
+from course_cache import CourseCache, CACHE_FIELDS
+from course_parser import parse_remark_cap, parse_detail_cap
+from course_page import search_on_page
+from catalog import CourseCatalog
+from subscriptions import SubscriptionIndex
+from storage import CourseStore
+from locks import KeyedLocks
+from notifier import NotificationDispatcher
+from user_cache import UserNameCache
+from views import EmbedPaginator
+from events import ChangeDetector, EventBus, EnrollmentChanged, SeatOpened, SeatClosed
+from history import EnrollmentHistory, summarize
+from metrics import histogram, timed, gauge, process_rss_bytes, descendant_rss_bytes, LoopLagMonitor, MetricsServer
+from readiness import wait_for_detail_dialog
+from utils import debug_print
+
+# 讀取 Token
+load_dotenv()
+TOKEN = os.getenv("TOKEN")
+DATA_FILE = "courses.json"
+DB_FILE = os.getenv("DB_FILE", "courses.db")
+HISTORY_DB_FILE = os.getenv("HISTORY_DB_FILE", "history.db")
+HISTORY_RAW_DAYS = int(os.getenv("HISTORY_RAW_DAYS", "14"))
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "180"))
+
+# 查詢後端：api 直接呼叫搜尋 API；playwright 為網站改版時的備用方案
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "api").lower()
+COURSE_API_URL = os.getenv("COURSE_API_URL", API_BASE_URL)
+COURSE_SEMESTER = os.getenv("COURSE_SEMESTER") or None
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "10"))
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "3"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "120"))
+POLL_RATE_LIMIT = float(os.getenv("POLL_RATE_LIMIT", "2"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.2"))
+PRESSURE_SEATS = int(os.getenv("PRESSURE_SEATS", "3"))
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "5"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "3600"))
+NOTIFY_TICK = float(os.getenv("NOTIFY_TICK", "1"))
+NOTIFY_MIN_INTERVAL = float(os.getenv("NOTIFY_MIN_INTERVAL", "1"))
+SELECTION_WINDOWS = os.getenv("SELECTION_WINDOWS", "")
+PAGE_POOL_SIZE = int(os.getenv("PAGE_POOL_SIZE", "2"))
+PAGE_JOB_TIMEOUT = float(os.getenv("PAGE_JOB_TIMEOUT", "60"))
+# 每個頁面執行幾個工作後重建，以及瀏覽器行程 RSS 超過多少 MB 時換用新的 context（0 表示停用）
+PAGE_MAX_JOBS = int(os.getenv("PAGE_MAX_JOBS", "200"))
+BROWSER_RSS_LIMIT_MB = float(os.getenv("BROWSER_RSS_LIMIT_MB", "1024"))
+# 兩次重建 context 之間的最短秒數，重建後記憶體仍超過上限時不會每分鐘重建一次
+BROWSER_RECYCLE_INTERVAL = float(os.getenv("BROWSER_RECYCLE_INTERVAL", "1800"))
+TASK_MAX_BACKOFF = float(os.getenv("TASK_MAX_BACKOFF", "300"))
+# 需要瀏覽器的查詢最多等待背景啟動的秒數，以及啟動後等待所有課程完成第一次輪詢的秒數
+BROWSER_READY_TIMEOUT = float(os.getenv("BROWSER_READY_TIMEOUT", "60"))
+STARTUP_COVERAGE_TIMEOUT = float(os.getenv("STARTUP_COVERAGE_TIMEOUT", "600"))
+QUERY_URL = os.getenv("QUERY_URL", "https://querycourse.ntust.edu.tw/querycourse/#/")
+COURSE_CACHE_FILE = "course_cache.json"
+COURSE_CACHE_TTL = float(os.getenv("COURSE_CACHE_TTL", "21600"))
+COURSE_CACHE_SIZE = int(os.getenv("COURSE_CACHE_SIZE", "2000"))
+CATALOG_FILE = os.getenv("CATALOG_FILE", "catalog.json")
+CATALOG_REFRESH = float(os.getenv("CATALOG_REFRESH", "3600"))
+SEARCH_PAGE_SIZE = 10
+# 每位使用者（所有伺服器合計）與每個伺服器可追蹤的課程數上限，0 表示不限制
+MAX_COURSES_PER_USER = int(os.getenv("MAX_COURSES_PER_USER", "20"))
+MAX_COURSES_PER_GUILD = int(os.getenv("MAX_COURSES_PER_GUILD", "100"))
+# 大於 0 時改為協調者模式，由 SHARD_WORKERS 個 worker 行程分散輪詢
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "0"))
+# 設定 METRICS_PORT 後在本機提供 Prometheus 格式的 /metrics
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT") or "0")
+
+intents = discord.Intents.default()
+intents.message_content = True
+bot = commands.Bot(command_prefix="!", intents=intents)
+
+tracked_courses = {}
+guild_channels = {}
+subscription_index = SubscriptionIndex()
+store = None
+enrollment_history = None
+guild_locks = KeyedLocks("guild")
+course_locks = KeyedLocks("course")
+playwright_browser = None
+playwright_context = None
+page_pool = None
+supervisor = Supervisor(max_backoff=TASK_MAX_BACKOFF)
+supervisor_task = None
+startup_task = None
+startup_started = time.perf_counter()
+startup_times = {}
+# Playwright 在背景啟動，完成前需要頁面的查詢會在此等待
+browser_ready = asyncio.Event()
+metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT) if METRICS_PORT else None
+loop_lag = LoopLagMonitor()
+course_api = CourseApiClient(base_url=COURSE_API_URL, semester=COURSE_SEMESTER)
+course_cache = CourseCache(COURSE_CACHE_FILE, COURSE_CACHE_TTL, COURSE_CACHE_SIZE)
+course_catalog = CourseCatalog(CATALOG_FILE, CATALOG_REFRESH)
+user_names = UserNameCache(bot, ttl=USER_CACHE_TTL)
+notifier = NotificationDispatcher(bot.get_channel, tick=NOTIFY_TICK, min_send_interval=NOTIFY_MIN_INTERVAL)
+
+def use_playwright():
+    return FETCH_BACKEND == "playwright"
+
+def current_semester():
+    return course_api.semester or COURSE_SEMESTER or "current"
+
+async def catalog_semester():
+    if use_playwright():
+        return current_semester()
+    return await course_api.get_semester()
+
+def find_tracked_course(course_code):
+    """回傳任一伺服器中該課程的追蹤資料，沒有則回傳 None"""
+    for guild_id in subscription_index.guilds_for(course_code):
+        info = tracked_courses.get(guild_id, {}).get(course_code)
+        if info is not None:
+            return info
+    return None
+
+def check_quota(guild_id, user_id, new_course):
+    """超過追蹤數量上限時回傳要告知使用者的訊息，否則回傳 None"""
+    followed = subscription_index.user_count(user_id)
+    if MAX_COURSES_PER_USER and followed >= MAX_COURSES_PER_USER:
+        return f"⚠️ 你已追蹤 {followed} 門課程，達到每人上限 {MAX_COURSES_PER_USER} 門，請先用 `/del` 取消部分課程。"
+    guild_count = len(tracked_courses.get(guild_id, {}))
+    if new_course and MAX_COURSES_PER_GUILD and guild_count >= MAX_COURSES_PER_GUILD:
+        return f"⚠️ 此伺服器已追蹤 {guild_count} 門課程，達到上限 {MAX_COURSES_PER_GUILD} 門，請先取消部分課程。"
+    return None
+
+def cache_course(course_code, info):
+    """將 tracked_courses 格式的課程資料寫入課程快取，檔案由背景工作定期寫入"""
+    course_cache.put(current_semester(), course_code, {field: info.get(field) for field in CACHE_FIELDS})
+
+# === SQLite 儲存與載入 ===
+def load_data():
+    global store, tracked_courses, guild_channels
+    store = CourseStore(DB_FILE)
+    # 舊版 courses.json 只在資料庫為空時匯入一次
+    store.migrate_json(DATA_FILE)
+    tracked_courses, guild_channels = store.load()
+    subscription_index.rebuild(tracked_courses)
+
+def save_course(guild_id, course_code):
+    """在背景寫入單一課程的變更，課程已不再追蹤時刪除該筆資料"""
+    info = tracked_courses.get(guild_id, {}).get(course_code)
+    if info is None:
+        return store.delete_course(guild_id, course_code)
+    return store.save_course(guild_id, course_code, info)
+
+DIALOG_TEXT_JS = """() => {
+    let dialog = document.querySelector(".v-dialog--active");
+    return dialog ? dialog.innerText : null;
+}"""
+
+async def get_max_students_improved(page):
+    """
+    改進的 max_students 提取函數
+    優先使用點擊 more_horiz 按鈕獲取詳細資訊
+    如果失敗則回退到備註欄提取
+    """
+    
+    # 方法1：點擊 more_horiz 按鈕獲取詳細資訊
+    try:
+        debug_print("嘗試點擊 more_horiz 按鈕獲取詳細資訊...")
+        
+        # 點擊 more_horiz 按鈕
+        clicked = await page.evaluate("""() => {
+            let icons = document.querySelectorAll('i.material-icons');
+            for (let icon of icons) {
+                if (icon.textContent && icon.textContent.trim() === 'more_horiz') {
+                    icon.click();
+                    return true;
+                }
+            }
+            return false;
+        }""")
+        
+        if clicked:
+            # 等待詳細資訊視窗載入
+            await wait_for_detail_dialog(page)
+            
+            # 只讀取詳細資訊視窗的文字，由預先編譯的樣式一次解析
+            max_students = parse_detail_cap(await page.evaluate(DIALOG_TEXT_JS))
+
+            if max_students:
+                debug_print(f"✅ 從詳細資訊提取 max_students: {max_students}")
+                return max_students
+    
+    except Exception as e:
+        debug_print(f"點擊方法失敗: {e}")
+    
+    # 方法2：回退到備註欄提取
+    try:
+        debug_print("回退到備註欄提取方法...")
+        
+        remark_text = await page.evaluate("""() => {
+            let table = document.querySelector(".v-datatable");
+            if (!table) return null;
+            let row = table.querySelector("tbody tr");
+            if (!row) return null;
+            let cols = row.querySelectorAll("td");
+            if (cols.length <= 10) return null;
+            return cols[10].innerText.trim();
+        }""")
+        
+        if remark_text:
+            max_from_remark = parse_remark_cap(remark_text)
+            if max_from_remark:
+                debug_print(f"✅ 從備註欄提取 max_students: {max_from_remark}")
+                return max_from_remark
+    
+    except Exception as e:
+        debug_print(f"備註欄提取失敗: {e}")
+    
+    debug_print("❌ 無法提取 max_students")
+    return None
+
+async def browser_search(keyword):
+    """從頁面池借用頁面搜尋課程（備用方案）"""
+    if not await wait_for_browser():
+        raise TimeoutError(f"瀏覽器在 {BROWSER_READY_TIMEOUT:.0f} 秒內未就緒")
+    return await page_pool.run(lambda page: search_on_page(page, QUERY_URL, keyword))
+
+async def search_courses(keyword):
+    """查詢課程資料列，依 FETCH_BACKEND 使用 API 或瀏覽器頁面"""
+    if use_playwright():
+        return await browser_search(keyword)
+    return await course_api.search(keyword)
+
+def get_course_subscriptions():
+    """回傳 {course_code: (guild_id, ...)}，同一課程在多個伺服器只查詢一次"""
+    return subscription_index.snapshot()
+
+async def handle_course_row(guild_id, course_code, course):
+    """將輪詢取得的課程資料更新到指定伺服器，並在有名額時通知"""
+    enrolled_students = course["enrolled_students"]
+    message = None
+    async with course_locks.acquire((guild_id, course_code)):
+        info = tracked_courses.get(guild_id, {}).get(course_code)
+        if info is None:
+            debug_print(f"📌 課程 {course_code} 已不再追蹤，略過更新")
+            return
+
+        max_students = course.get("max_students") or info["max_students"]
+        debug_print(f"📌 追蹤中，取得課程資訊: {course['course_name']} ({enrolled_students}/{max_students})")
+
+        info.update({
+            "name": course["course_name"],
+            "teacher": course["teacher_name"],
+            "lesson_time": course["lesson_time"],
+            "classroom": course["classroom"],
+            "remark": course["remark_text"],
+            "enrolled_students": enrolled_students,
+            "max_students": max_students,
+        })
+
+        if enrolled_students is not None and max_students is not None:
+            if enrolled_students < max_students:
+                if not info["notified"]:
+                    debug_print(f"✅ {course_code} 有名額，發送通知")
+                    info["notified"] = True
+                    followers = set(info["followers"])
+                    message = (
+                        f"🎉 **{course['course_code']} {course['course_name']}** 有名額！\n"
+                        f"👨‍🏫 **授課教師:** {course['teacher_name']}\n"
+                        f"🕒 **時間:** {course['lesson_time']}\n"
+                        f"📍 **教室:** {course['classroom']}\n"
+                        f"📌 **目前人數:** {enrolled_students}/{max_students}\n"
+                        f"🔗 [前往選課](https://courseselection.ntust.edu.tw/AddAndSub/B01/B01)"
+                    )
+            else:
+                info["notified"] = False
+
+    # 快取更新與排入通知都在釋放鎖之後進行
+    cache_course(course_code, info)
+    if message:
+        debug_print(f"📤 排入課程名額通知: {course['course_code']} {course['course_name']} ({enrolled_students}/{max_students})")
+        notifier.enqueue(guild_channels.get(guild_id), followers, message, key=course_code, priority=1)
+
+def refresh_cached_course(course_code, row):
+    """輪詢資料沒有變化時只延長快取期限，快取已被淘汰時以追蹤資料補回"""
+    if course_cache.touch(current_semester(), course_code):
+        return
+    info = find_tracked_course(course_code)
+    if info is not None:
+        cache_course(course_code, info)
+
+def get_tracked_capacity(course_code):
+    return (find_tracked_course(course_code) or {}).get("max_students")
+
+async def log_seat_event(event):
+    state = "釋出名額" if isinstance(event, SeatOpened) else "已額滿"
+    debug_print(f"🔔 課程 {event.course_code} {state} ({event.enrolled}/{event.maximum})")
+
+change_detector = ChangeDetector(get_tracked_capacity)
+event_bus = EventBus()
+event_bus.subscribe(SeatOpened, log_seat_event)
+event_bus.subscribe(SeatClosed, log_seat_event)
+
+async def record_enrollment(event):
+    if enrollment_history:
+        enrollment_history.record(event.course_code, event.enrolled, event.maximum)
+
+event_bus.subscribe(EnrollmentChanged, record_enrollment)
+
+poll_scheduler = PollScheduler(
+    search_courses,
+    get_course_subscriptions,
+    handle_course_row,
+    interval=POLL_INTERVAL,
+    batch=not use_playwright(),
+    concurrency=PAGE_POOL_SIZE if use_playwright() else 4,
+    min_interval=POLL_MIN_INTERVAL,
+    max_interval=POLL_MAX_INTERVAL,
+    jitter=POLL_JITTER,
+    rate_limit=POLL_RATE_LIMIT,
+    pressure_seats=PRESSURE_SEATS,
+    selection_windows=parse_selection_windows(SELECTION_WINDOWS),
+    get_capacity=get_tracked_capacity,
+    detector=change_detector,
+    on_events=event_bus.publish_all,
+    on_unchanged=refresh_cached_course,
+)
+
+shard_coordinator = None
+if SHARD_WORKERS > 0:
+    shard_coordinator = ShardCoordinator(
+        get_course_subscriptions,
+        get_tracked_capacity,
+        poll_scheduler.deliver,
+        change_detector.forget,
+        {
+            "backend": FETCH_BACKEND,
+            "api_url": COURSE_API_URL,
+            "semester": COURSE_SEMESTER,
+            "query_url": QUERY_URL,
+            "interval": POLL_INTERVAL,
+            "min_interval": POLL_MIN_INTERVAL,
+            "max_interval": POLL_MAX_INTERVAL,
+            "jitter": POLL_JITTER,
+            # 查詢預算由所有 worker 平分，對查詢網站的總負載不變
+            "rate_limit": POLL_RATE_LIMIT / SHARD_WORKERS,
+            "pressure_seats": PRESSURE_SEATS,
+            "selection_windows": SELECTION_WINDOWS,
+            "concurrency": PAGE_POOL_SIZE if use_playwright() else 4,
+            "page_pool_size": PAGE_POOL_SIZE,
+            "page_job_timeout": PAGE_JOB_TIMEOUT,
+            "page_max_jobs": PAGE_MAX_JOBS,
+        },
+        workers=SHARD_WORKERS,
+        on_unchanged=refresh_cached_course,
+    )
+
+gauge("process_rss_bytes", process_rss_bytes)
+gauge("event_loop_lag_current_seconds", lambda: loop_lag.current)
+gauge("event_loop_lag_peak_seconds", lambda: loop_lag.peak)
+gauge("pages_open", lambda: page_pool.open_pages() if page_pool else 0)
+gauge("page_pool_pending_jobs", lambda: page_pool.pending() if page_pool else 0)
+gauge("notify_queue_depth", lambda: notifier.queue_depth())
+gauge("tracked_subscriptions", lambda: subscription_index.stats()["subscriptions"])
+gauge("tracked_distinct_courses", lambda: subscription_index.stats()["distinct_courses"])
+gauge("tracked_users", lambda: subscription_index.stats()["users"])
+gauge("polled_courses", lambda: (shard_coordinator or poll_scheduler).coverage()[1])
+gauge("browser_rss_bytes", lambda: browser_rss_bytes() if page_pool else None)
+gauge("shard_workers_alive", lambda: shard_coordinator.alive() if shard_coordinator else None)
+
+STARTUP_STAGES = {
+    "ready": "可回應指令",
+    "first_command": "收到第一個指令",
+    "full_coverage": "所有課程完成第一次輪詢",
+}
+
+def report_startup(stage):
+    if stage in startup_times:
+        return
+    startup_times[stage] = time.perf_counter() - startup_started
+    debug_print(f"⏱️ 啟動後 {startup_times[stage]:.2f}s {STARTUP_STAGES[stage]}")
+
+for stage in STARTUP_STAGES:
+    gauge(f"startup_{stage}_seconds", lambda stage=stage: startup_times.get(stage))
+
+@bot.event
+async def on_ready():
+    global startup_task
+    if startup_task is not None:
+        # 斷線重連時 on_ready 會再次觸發，背景服務已在執行，不需要重新啟動
+        debug_print(f"🔁 已重新連線：{bot.user}")
+        return
+    debug_print(f"✅ Bot 已啟動：{bot.user}")
+    # 追蹤資料在連線前已載入，指令可以立即回應；其餘初始化都在背景進行
+    report_startup("ready")
+    startup_task = asyncio.create_task(start_services())
+    startup_task.add_done_callback(log_startup_result)
+
+def log_startup_result(task):
+    if not task.cancelled() and task.exception():
+        error = task.exception()
+        debug_print(f"❌ 背景初始化失敗：{type(error).__name__}: {error}")
+
+@bot.listen("on_interaction")
+async def record_first_command(interaction: discord.Interaction):
+    report_startup("first_command")
+
+async def sync_command_tree():
+    """只有指令定義改變時才同步，以指令內容的雜湊值判斷"""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+    if store.get_meta("command_tree_hash") == digest:
+        debug_print("🌲 指令未變更，略過同步")
+        return
+    await bot.tree.sync()
+    await store.set_meta("command_tree_hash", digest)
+    debug_print(f"🌲 已同步 {len(payload)} 個指令")
+
+async def start_services():
+    global supervisor_task
+    if supervisor_task is None or supervisor_task.done():
+        supervisor_task = asyncio.create_task(supervisor.run())
+    supervisor.add("loop_lag", loop_lag.run)
+    supervisor.add("notify", notifier.run)
+    supervisor.add("history", enrollment_history.run)
+    supervisor.add("course_cache", course_cache.run)
+
+    if not use_playwright():
+        try:
+            await course_api.get_semester()
+        except Exception as e:
+            debug_print(f"⚠️ 取得目前學期失敗: {e}")
+
+    # 以快取補齊缺少上限的課程，並將已追蹤的課程資料寫回快取
+    for courses in tracked_courses.values():
+        for course_code, data in courses.items():
+            if data.get("max_students") is None:
+                cached = course_cache.get(current_semester(), course_code)
+                if cached:
+                    data["max_students"] = cached["max_students"]
+            cache_course(course_code, data)
+
+    # 輪詢與其他背景工作在任何可能失敗的步驟之前交給 supervisor，瀏覽器或指令同步失敗也不影響輪詢；
+    # 課程由排程器依查詢預算與併發上限逐步輪詢，不會在啟動時一次建立大量頁面
+    course_count = sum(len(courses) for courses in tracked_courses.values())
+    debug_print(f"🔄 初始化追蹤 {course_count} 個課程")
+    poller = shard_coordinator or poll_scheduler
+    supervisor.add("poll", poller.run)
+    supervisor.add("catalog", lambda: course_catalog.run(search_courses, catalog_semester))
+
+    if not periodic_notify.is_running():
+        periodic_notify.start()
+
+    if metrics_server:
+        try:
+            await metrics_server.start()
+        except OSError as e:
+            debug_print(f"⚠️ 無法啟動量測端點: {e}")
+
+    try:
+        await sync_command_tree()
+    except Exception as e:
+        debug_print(f"⚠️ 同步指令失敗: {type(e).__name__}: {e}")
+
+    if use_playwright():
+        await start_browser()
+        if BROWSER_RSS_LIMIT_MB:
+            supervisor.add("browser_memory", watch_browser_memory)
+
+    # 找不到的課程不會完成第一次輪詢，最多等待 STARTUP_COVERAGE_TIMEOUT 秒
+    deadline = time.monotonic() + STARTUP_COVERAGE_TIMEOUT
+    while time.monotonic() < deadline:
+        covered, _ = poller.coverage()
+        if covered >= len(get_course_subscriptions()):
+            report_startup("full_coverage")
+            return
+        await asyncio.sleep(1)
+    covered, total = poller.coverage()
+    debug_print(f"⚠️ 啟動 {STARTUP_COVERAGE_TIMEOUT:.0f} 秒後仍有課程未完成第一次輪詢 ({covered}/{total})")
+
+async def start_browser():
+    """啟動 Playwright 與頁面池，失敗時以指數退避重試，完成後設定 browser_ready"""
+    global playwright_browser, playwright_context, page_pool
+    delay = 5
+    while True:
+        playwright = None
+        try:
+            playwright = await async_playwright().start()
+            playwright_browser = await playwright.chromium.launch(headless=True)
+            playwright_context = await playwright_browser.new_context()
+            page_pool = PagePool(playwright_context, PAGE_POOL_SIZE, PAGE_JOB_TIMEOUT, PAGE_MAX_JOBS)
+            await page_pool.start()
+            browser_ready.set()
+            return
+        except Exception as e:
+            debug_print(f"❌ 啟動瀏覽器失敗，{delay:.0f} 秒後重試：{type(e).__name__}: {e}")
+            if playwright:
+                try:
+                    await playwright.stop()
+                except Exception:
+                    pass
+            playwright_browser = None
+            await asyncio.sleep(delay)
+            delay = min(TASK_MAX_BACKOFF, delay * 2)
+
+async def wait_for_browser():
+    """等待背景啟動的瀏覽器最多 BROWSER_READY_TIMEOUT 秒，回傳是否已就緒"""
+    try:
+        await asyncio.wait_for(browser_ready.wait(), BROWSER_READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+def browser_rss_bytes():
+    """本行程 Playwright 瀏覽器的 RSS，不含 worker 行程與它們的瀏覽器"""
+    return descendant_rss_bytes(exclude={process.pid for process in multiprocessing.active_children()})
+
+async def watch_browser_memory():
+    """
+    瀏覽器行程的 RSS 超過 BROWSER_RSS_LIMIT_MB 時，讓頁面池換用新的 context
+    兩次重建至少間隔 BROWSER_RECYCLE_INTERVAL 秒，避免記憶體不在 context 中時反覆重建
+    """
+    global playwright_context
+    replaced_at = None
+    while True:
+        await asyncio.sleep(60)
+        rss = browser_rss_bytes()
+        if rss is None or rss < BROWSER_RSS_LIMIT_MB * 1024 * 1024:
+            continue
+        if replaced_at is not None and time.monotonic() - replaced_at < BROWSER_RECYCLE_INTERVAL:
+            continue
+        debug_print(f"♻️ 瀏覽器記憶體 {rss / 1024 / 1024:.0f} MB 超過上限 {BROWSER_RSS_LIMIT_MB:.0f} MB，重建 context")
+        replaced_at = time.monotonic()
+        playwright_context = await playwright_browser.new_context()
+        await page_pool.replace_context(playwright_context)
+
+@tasks.loop(minutes=1)
+async def periodic_notify():
+    # 定期提醒交給通知佇列，同一頻道的提醒會合併成一則訊息
+    for guild_id, courses in tracked_courses.items():
+        channel_id = guild_channels.get(guild_id)
+        if not channel_id:
+            continue
+        for course_code, data in courses.items():
+            if data["notified"]:
+                message = (
+                    f"📢 **`{course_code} {data['name']}`** 仍有名額！\n"
+                    f"🔗 [前往選課](https://courseselection.ntust.edu.tw/AddAndSub/B01/B01)"
+                )
+                debug_print(f"📤 排入定期提醒通知: {course_code} {data['name']}")
+                notifier.enqueue(channel_id, data["followers"], message, key=course_code)
+
+ADD_STAGES = ("add_stage_cache", "add_stage_search", "add_stage_cap", "add_stage_handoff")
+
+async def validate_course_with_api(course_code, cached_cap=None):
+    """透過一次搜尋 API 驗證課程，人數上限取自同一份回應"""
+    try:
+        debug_print(f"🔍 正在驗證課程 {course_code}")
+        with timed("add_stage_search"):
+            rows = [row for row in await search_courses(course_code) if row["course_code"] == course_code]
+    except Exception as e:
+        debug_print(f"❌ 驗證課程 {course_code} 時發生錯誤: {e}")
+        return None
+    if not rows:
+        return None
+    details = rows[0]
+    with timed("add_stage_cap"):
+        details["max_students"] = details["max_students"] or cached_cap or parse_remark_cap(details["remark_text"])
+    debug_print(f"🎯 初始化課程 {course_code} 獲取到上限: {details['max_students']}")
+    return details
+
+async def validate_course_with_browser(course_code, guild_id=None, cached_cap=None):
+    """
+    借用頁面池的頁面驗證課程，並在同一頁面點開詳細資訊取得上限（備用方案）
+    快取已有上限時只搜尋一次取得人數，不點開詳細資訊
+    """
+    async def job(page):
+        with timed("add_stage_search"):
+            rows = await search_on_page(page, QUERY_URL, course_code)
+        # 搜尋為前綴比對，只接受課程代碼完全相同的資料列
+        matches = [row for row in rows if row["course_code"] == course_code]
+        if not matches:
+            return None
+        details = matches[0]
+        with timed("add_stage_cap"):
+            if cached_cap is not None:
+                details["max_students"] = cached_cap
+                return details
+            if details is not rows[0]:
+                # 詳細資訊按鈕與備註欄都取自表格第一列，不是這門課時改用回應中的上限或備註推算
+                details["max_students"] = details["max_students"] or parse_remark_cap(details["remark_text"])
+                return details
+            try:
+                details["max_students"] = await get_max_students_improved(page)
+                debug_print(f"🎯 初始化課程 {course_code} 獲取到上限: {details['max_students']}")
+            except Exception as e:
+                debug_print(f"❌ 獲取課程上限失敗，使用備用方法: {e}")
+                details["max_students"] = parse_remark_cap(details["remark_text"])
+            # 關閉詳細資訊視窗，讓頁面可以繼續用於其他查詢
+            await page.keyboard.press("Escape")
+        return details
+
+    if not await wait_for_browser():
+        debug_print(f"❌ 瀏覽器尚未就緒，無法驗證課程 {course_code}")
+        return None
+    try:
+        debug_print(f"🔍 正在驗證課程 {course_code}")
+        return await page_pool.run(job, key=guild_id)
+    except Exception as e:
+        debug_print(f"❌ 驗證課程 {course_code} 時發生錯誤: {e}")
+        return None
+
+def details_from_cache(course_code, cached):
+    """
+    快取有上限且其他伺服器正在追蹤（輪詢提供目前人數）時直接組出課程資料，
+    否則回傳 None，仍需搜尋一次取得人數
+    """
+    if not cached or cached["max_students"] is None:
+        return None
+    tracked = find_tracked_course(course_code)
+    if tracked is None or tracked.get("enrolled_students") is None:
+        return None
+    debug_print(f"⚡ 課程 {course_code} 命中快取 (命中 {course_cache.stats['hits']} / 未命中 {course_cache.stats['misses']})")
+    return {
+        "course_code": course_code,
+        "course_name": cached["name"],
+        "teacher_name": cached["teacher"],
+        "lesson_time": cached["lesson_time"],
+        "classroom": cached["classroom"],
+        "remark_text": tracked.get("remark", ""),
+        "enrolled_students": tracked.get("enrolled_students"),
+        "max_students": cached["max_students"],
+    }
+
+async def add_pipeline(course_code, guild_id):
+    """
+    /add 的單次查詢流程：快取 → 搜尋並解析資料列 → 從同一份回應或同一頁面取得上限
+    回傳包含 enrolled_students 與 max_students 的課程資料，找不到課程時回傳 None
+    """
+    with timed("add_stage_cache"):
+        cached = course_cache.get(current_semester(), course_code)
+        details = details_from_cache(course_code, cached)
+    if details:
+        return details
+    # 沒有目前人數時仍搜尋一次，快取中的上限可省去詳細資訊視窗的解析
+    cached_cap = cached["max_students"] if cached else None
+    if use_playwright():
+        return await validate_course_with_browser(course_code, guild_id, cached_cap)
+    return await validate_course_with_api(course_code, cached_cap)
+
+@bot.tree.command(name="add", description="追蹤指定課程")
+async def add(interaction: discord.Interaction, course_code: str):
+    with timed("add_total"):
+        await add_course(interaction, course_code)
+    debug_print(f"⏱️ /add 延遲 {histogram('add_total').summary()}")
+    for stage in ADD_STAGES:
+        debug_print(f"⏱️ {histogram(stage).summary()}")
+
+def describe_catalog_entry(entry):
+    return f"{entry['course_code']} {entry['course_name']} - {entry['teacher_name']} ({entry['lesson_time']})"
+
+@add.autocomplete("course_code")
+async def course_code_autocomplete(interaction: discord.Interaction, current: str):
+    # 由記憶體中的課程目錄回應，不查詢學校網站
+    return [
+        app_commands.Choice(name=describe_catalog_entry(entry)[:100], value=entry["course_code"])
+        for entry in course_catalog.lookup(current, limit=25)
+    ]
+
+async def add_course(interaction: discord.Interaction, course_code: str):
+    guild_id = interaction.guild.id
+    user_id = interaction.user.id
+    
+    debug_print(f"📩 收到追蹤課程請求: {interaction.user.name} ({user_id}) @ {interaction.guild.name} ({guild_id}) - {course_code}")
+    await interaction.response.defer()
+
+    async with guild_locks.acquire(guild_id):
+        courses = tracked_courses.setdefault(guild_id, {})
+        already_tracked = course_code in courses
+        if already_tracked and user_id in courses[course_code]["followers"]:
+            quota_error = None
+        else:
+            quota_error = check_quota(guild_id, user_id, new_course=not already_tracked)
+        if already_tracked and quota_error is None:
+            courses[course_code]["followers"].add(user_id)
+            subscription_index.follow(guild_id, course_code, user_id)
+            write = save_course(guild_id, course_code)
+
+    if quota_error:
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 已達追蹤上限")
+        await interaction.followup.send(quota_error, ephemeral=True)
+        return
+
+    if already_tracked:
+        await write
+        await interaction.followup.send(f"✅ 已將您加入 `{course_code}` 的追蹤列表。", ephemeral=True)
+        return
+
+    details = await add_pipeline(course_code, guild_id)
+    if details is None and use_playwright() and not browser_ready.is_set():
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 瀏覽器尚未就緒")
+        await interaction.followup.send("⚠️ 查詢服務仍在啟動中，請稍後再試。", ephemeral=True)
+        return
+    if details is None:
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 找不到課程 {course_code}")
+        await interaction.followup.send(f"⚠️ **找不到課程 `{course_code}`！**\n請檢查課程代碼是否正確，或稍後再試。", ephemeral=True)
+        return
+
+    enrolled = details["enrolled_students"]
+    maximum = details["max_students"]
+    try:
+        async with guild_locks.acquire(guild_id):
+            courses = tracked_courses.setdefault(guild_id, {})
+            # 查詢期間其他指令可能已改變追蹤數量，在鎖內再檢查一次
+            quota_error = check_quota(guild_id, user_id, new_course=course_code not in courses)
+            if quota_error is None:
+                if course_code in courses:
+                    # 查詢期間已有其他人加入同一課程，只需加入追蹤者
+                    courses[course_code]["followers"].add(user_id)
+                else:
+                    # 課程加入 tracked_courses 後，之後由集中輪詢接手
+                    courses[course_code] = {
+                        "name": details["course_name"],
+                        "teacher": details["teacher_name"],
+                        "lesson_time": details["lesson_time"],
+                        "classroom": details["classroom"],
+                        "remark": details["remark_text"],
+                        "notified": False,
+                        "followers": {user_id},
+                        "enrolled_students": enrolled,
+                        "max_students": maximum
+                    }
+                subscription_index.follow(guild_id, course_code, user_id)
+                # 與加入訂閱在同一段同步程式中排定輪詢，輪詢不會把這門課當成新課程立即再查詢；
+                # 協調者模式由 worker 各自排程，本行程的排程器不會執行
+                if shard_coordinator is None:
+                    poll_scheduler.schedule_known(course_code, details)
+                write = save_course(guild_id, course_code)
+        if quota_error:
+            await interaction.followup.send(quota_error, ephemeral=True)
+            return
+        await write
+        cache_course(course_code, courses[course_code])
+        debug_print(f"✅ 成功創建新的追蹤任務：{course_code}")
+    except Exception as e:
+        debug_print(f"❌ 創建追蹤任務失敗 {course_code}: {e}")
+        await interaction.followup.send(f"⚠️ 創建追蹤任務時發生錯誤，請稍後重試。", ephemeral=True)
+        return
+
+    # 直接把這次查詢的結果交給輪詢處理，若已有名額立即通知，不必再查詢一次；
+    # 變更偵測的指紋是所有伺服器共用的，有變化時必須分送給每個訂閱的伺服器
+    with timed("add_stage_handoff"):
+        guild_ids = tuple(subscription_index.guilds_for(course_code))
+        if not await poll_scheduler.deliver(course_code, details, guild_ids):
+            # 與輪詢上次取得的資料相同，其他伺服器已是最新狀態，只需更新此伺服器
+            await handle_course_row(guild_id, course_code, details)
+
+    debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 已成功開始追蹤課程 {details['course_code']} - {details['course_name']} ({enrolled}/{maximum})")
+    await interaction.followup.send(f"✅ 已成功找到並開始追蹤課程：\n**`{details['course_code']} - {details['course_name']} ({enrolled}/{maximum})`**")
+
+
+
+@bot.tree.command(name="del", description="取消追蹤課程")
+async def delete_course(interaction: discord.Interaction, course_code: str):
+    guild_id = interaction.guild.id
+    user_id = interaction.user.id
+    
+    debug_print(f"📩 收到取消追蹤請求: {interaction.user.name} ({user_id}) @ {interaction.guild.name} ({guild_id}) - {course_code}")
+    async with guild_locks.acquire(guild_id):
+        tracked = guild_id in tracked_courses and course_code in tracked_courses[guild_id]
+        if tracked:
+            async with course_locks.acquire((guild_id, course_code)):
+                tracked_courses[guild_id][course_code]["followers"].discard(user_id)
+                subscription_index.unfollow(guild_id, course_code, user_id)
+                if not tracked_courses[guild_id][course_code]["followers"]:
+                    del tracked_courses[guild_id][course_code]
+            if course_code not in tracked_courses[guild_id]:
+                # 只移除此伺服器的訂閱，其他伺服器仍追蹤時課程會繼續輪詢
+                subscription_index.drop(guild_id, course_code)
+                course_locks.discard((guild_id, course_code))
+            write = save_course(guild_id, course_code)
+
+    if tracked:
+        await write
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 已取消追蹤課程 {course_code}")
+        await interaction.response.send_message(f"✅ 你已取消追蹤 `{course_code}`")
+    else:
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({user_id}) 嘗試取消未追蹤的課程 {course_code}")
+        await interaction.response.send_message(f"⚠️ 你未追蹤 `{course_code}`！")
+
+@bot.tree.command(name="set_channel", description="設定通知頻道")
+async def set_channel(interaction: discord.Interaction):
+    guild_id = interaction.guild.id
+    
+    debug_print(f"📩 收到設定通知頻道請求: {interaction.user.name} ({interaction.user.id}) @ {interaction.guild.name} ({guild_id}) - #{interaction.channel.name} ({interaction.channel.id})")
+    guild_channels[guild_id] = interaction.channel.id
+    await store.set_channel(guild_id, interaction.channel.id)
+    debug_print(f"📤 通知使用者 {interaction.user.name} ({interaction.user.id}) 已設定通知頻道為 #{interaction.channel.name} ({interaction.channel.id})")
+    await interaction.response.send_message(f"✅ 此頻道已設定為通知頻道！")
+
+@bot.tree.command(name="help", description="顯示所有指令的說明")
+async def help_command(interaction: discord.Interaction):
+    debug_print(f"📩 收到說明指令請求: {interaction.user.name} ({interaction.user.id}) @ {interaction.guild.name} ({interaction.guild.id})")
+    embed = discord.Embed(
+        title="🤖 機器人指令說明",
+        description="以下是所有可用的斜線指令：",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="`/add <course_code>`", value="開始追蹤一個新的課程。", inline=False)
+    embed.add_field(name="`/del <course_code>`", value="取消追蹤一個指定的課程。", inline=False)
+    embed.add_field(name="`/list`", value="列出此伺服器上所有正在追蹤的課程。", inline=False)
+    embed.add_field(name="`/mine`", value="列出你在所有伺服器追蹤的課程。", inline=False)
+    embed.add_field(name="`/search <query>`", value="以課程代碼、名稱、教師、時間或教室搜尋本學期課程。", inline=False)
+    embed.add_field(name="`/history <course_code>`", value="查看課程最近的人數變動與常釋出名額的時段。", inline=False)
+    embed.add_field(name="`/set_channel`", value="將目前的頻道設為接收通知的頻道。", inline=False)
+    embed.add_field(name="`/help`", value="顯示這則說明訊息。", inline=False)
+    embed.add_field(name="GitHub 原始碼", value="[NTUST Course Scraper Bot](https://github.com/Ning0612/NTUST-Course-Scraper-Bot)", inline=False)
+    embed.set_footer(text="NTUST Course Scraper Bot")
+    debug_print(f"📤 向使用者 {interaction.user.name} ({interaction.user.id}) 發送說明訊息")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="history", description="查看課程的人數變動紀錄")
+async def history_command(interaction: discord.Interaction, course_code: str, days: int = 7):
+    debug_print(f"📩 收到人數紀錄請求: {interaction.user.name} ({interaction.user.id}) @ {interaction.guild.name} ({interaction.guild.id}) - {course_code}")
+    await interaction.response.defer()
+    days = max(1, min(days, HISTORY_RETENTION_DAYS))
+    samples = await enrollment_history.samples(course_code, time.time() - days * 86400)
+    if not samples:
+        await interaction.followup.send(f"⚠️ 最近 {days} 天沒有 `{course_code}` 的人數紀錄，只有追蹤中的課程會被記錄。")
+        return
+
+    summary = summarize(samples)
+    latest_ts, latest_enrolled, latest_max = samples[-1]
+    embed = discord.Embed(
+        title=f"📈 {course_code} 最近 {days} 天的人數變動",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="📌 最新人數", value=f"{latest_enrolled}/{latest_max}", inline=True)
+    embed.add_field(name="🔄 變動次數", value=str(summary["changes"]), inline=True)
+    embed.add_field(name="📊 人數範圍", value=f"{summary['min']} ~ {summary['max']}", inline=True)
+    if summary["opened_hours"]:
+        opened = "\n".join(f"{hour:02d}:00 ~ {hour:02d}:59（{count} 次）" for hour, count in summary["opened_hours"])
+    else:
+        opened = "尚無額滿後釋出名額的紀錄"
+    embed.add_field(name="🕒 常釋出名額的時段", value=opened, inline=False)
+    recent = "\n".join(
+        f"{datetime.datetime.fromtimestamp(ts).strftime('%m/%d %H:%M')}　{enrolled}/{maximum}"
+        for ts, enrolled, maximum in samples[-10:]
+    )
+    embed.add_field(name="🧾 最近的變動", value=recent[:1024], inline=False)
+    embed.set_footer(text="NTUST Course Scraper Bot")
+    debug_print(f"📤 向使用者 {interaction.user.name} ({interaction.user.id}) 發送 {course_code} 人數紀錄 ({len(samples)} 筆)")
+    await interaction.followup.send(embed=embed)
+
+@bot.tree.command(name="search", description="以課程代碼、名稱、教師、時間或教室搜尋本學期課程")
+async def search_command(interaction: discord.Interaction, query: str):
+    debug_print(f"📩 收到課程搜尋請求: {interaction.user.name} ({interaction.user.id}) @ {interaction.guild.name} ({interaction.guild.id}) - {query}")
+    if not course_catalog.entries:
+        await interaction.response.send_message("⚠️ 課程目錄尚未下載完成，請稍後再試。", ephemeral=True)
+        return
+    results = course_catalog.lookup(query, limit=100)
+    if not results:
+        await interaction.response.send_message(f"⚠️ 找不到符合 `{query}` 的課程。", ephemeral=True)
+        return
+
+    embeds = build_search_embeds(query, results)
+    debug_print(f"📤 向使用者 {interaction.user.name} ({interaction.user.id}) 發送 {len(results)} 筆搜尋結果")
+    if len(embeds) == 1:
+        await interaction.response.send_message(embed=embeds[0])
+    else:
+        await interaction.response.send_message(embed=embeds[0], view=EmbedPaginator(embeds, interaction.user.id))
+
+def build_search_embeds(query, results):
+    """將搜尋結果分頁成多個 embed，每頁 SEARCH_PAGE_SIZE 門課程"""
+    pages = [results[i:i + SEARCH_PAGE_SIZE] for i in range(0, len(results), SEARCH_PAGE_SIZE)]
+    embeds = []
+    for page_number, page_items in enumerate(pages, start=1):
+        embed = discord.Embed(
+            title=f"🔎 「{query}」的搜尋結果"[:256],
+            description=f"共 {len(results)} 門課程，使用 `/add` 開始追蹤",
+            color=discord.Color.blue()
+        )
+        for entry in page_items:
+            value = (
+                f"👨‍🏫 {entry['teacher_name']}　🕒 {entry['lesson_time']}　"
+                f"📍 {entry['classroom']}　👥 上限 {entry['max_students']}"
+            )
+            embed.add_field(name=f"📌 {entry['course_code']} - {entry['course_name']}"[:256], value=value[:1024], inline=False)
+        embed.set_footer(text=f"第 {page_number}/{len(pages)} 頁 · NTUST Course Scraper Bot")
+        embeds.append(embed)
+    return embeds
+
+@bot.tree.command(name="mine", description="列出你在所有伺服器追蹤的課程")
+async def mine_command(interaction: discord.Interaction):
+    user_id = interaction.user.id
+    debug_print(f"📩 收到個人追蹤列表請求: {interaction.user.name} ({user_id})")
+    follows = subscription_index.courses_for(user_id)
+    if not follows:
+        await interaction.response.send_message("⚠️ 你目前沒有追蹤任何課程，使用 `/add` 開始追蹤。", ephemeral=True)
+        return
+
+    lines = []
+    for guild_id, course_code in follows:
+        data = tracked_courses.get(guild_id, {}).get(course_code)
+        if data is None:
+            continue
+        guild = bot.get_guild(guild_id)
+        guild_name = guild.name if guild else str(guild_id)
+        lines.append(
+            f"📌 **{course_code} {data['name']}**（{data['enrolled_students']}/{data['max_students']}）· {guild_name}"
+        )
+    quota = f" / {MAX_COURSES_PER_USER}" if MAX_COURSES_PER_USER else ""
+    embed = discord.Embed(
+        title="🙋 你追蹤的課程",
+        description="\n".join(lines)[:4096],
+        color=discord.Color.blue()
+    )
+    embed.set_footer(text=f"共 {len(lines)}{quota} 門 · NTUST Course Scraper Bot")
+    debug_print(f"📤 向使用者 {interaction.user.name} ({user_id}) 發送個人追蹤列表 ({len(lines)} 門)")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="list", description="列出此伺服器追蹤中的課程")
+async def list_courses(interaction: discord.Interaction):
+    guild_id = interaction.guild_id
+    
+    debug_print(f"📩 收到課程列表請求: {interaction.user.name} ({interaction.user.id}) @ {interaction.guild.name} ({guild_id})")
+    async with guild_locks.acquire(guild_id):
+        courses_copy = tracked_courses.get(guild_id, {}).copy()
+    if not courses_copy:
+        debug_print(f"📤 通知使用者 {interaction.user.name} ({interaction.user.id}) 該伺服器無追蹤中的課程")
+        await interaction.response.send_message("⚠️ 目前此伺服器無追蹤中的課程！")
+        return
+
+    await interaction.response.defer()
+    follower_ids = set().union(*(data["followers"] for data in courses_copy.values()))
+    names = await user_names.resolve(follower_ids, interaction.guild)
+    embeds = build_course_list_embeds(courses_copy, names)
+
+    debug_print(f"📤 向使用者 {interaction.user.name} ({interaction.user.id}) 發送課程列表 ({len(embeds)} 頁)")
+    if len(embeds) == 1:
+        await interaction.followup.send(embed=embeds[0])
+    else:
+        await interaction.followup.send(embed=embeds[0], view=EmbedPaginator(embeds, interaction.user.id))
+
+def build_course_list_embeds(courses, names):
+    """將課程列表分頁成多個 embed，每頁 LIST_PAGE_SIZE 門課程"""
+    items = sorted(courses.items())
+    pages = [items[i:i + LIST_PAGE_SIZE] for i in range(0, len(items), LIST_PAGE_SIZE)]
+    embeds = []
+    for page_number, page_items in enumerate(pages, start=1):
+        embed = discord.Embed(
+            title="📚 此伺服器追蹤中的課程",
+            description=f"共 {len(items)} 門課程",
+            color=discord.Color.blue()
+        )
+        for code, data in page_items:
+            followers = ", ".join(sorted(names.get(user_id, str(user_id)) for user_id in data["followers"])) or "無人追蹤"
+            value = (
+                f"👨‍🏫 **教師:** {data['teacher']}\n"
+                f"🕒 **時間:** {data['lesson_time']}\n"
+                f"📍 **教室:** {data['classroom']}\n"
+                f"📌 **目前人數:** {data['enrolled_students']}/{data['max_students']}\n"
+                f"👥 **追蹤者:** {followers}"
+            )
+            embed.add_field(name=f"📌 {code} - {data['name']}"[:256], value=value[:1024], inline=False)
+        embed.set_footer(text=f"第 {page_number}/{len(pages)} 頁 · NTUST Course Scraper Bot")
+        embeds.append(embed)
+    return embeds
+
+async def shutdown():
+    if supervisor_task:
+        supervisor_task.cancel()
+    await supervisor.close()
+    if shard_coordinator:
+        shard_coordinator.close()
+    if metrics_server:
+        await metrics_server.close()
+    await course_api.close()
+    if course_cache.dirty:
+        course_cache.save()
+    if page_pool:
+        await page_pool.close()
+    if store:
+        store.close()
+    if enrollment_history:
+        enrollment_history.close()
+    if playwright_browser:
+        await playwright_browser.close()
+
+async def main():
+    global enrollment_history
+    load_data()
+    enrollment_history = EnrollmentHistory(HISTORY_DB_FILE, HISTORY_RAW_DAYS, HISTORY_RETENTION_DAYS)
+    course_cache.load()
+    course_catalog.load()
+    try:
+        await bot.start(TOKEN)
+    finally:
+        await shutdown()
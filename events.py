@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from utils import debug_print
+
+FINGERPRINT_FIELDS = (
+    "enrolled_students", "max_students", "course_name", "teacher_name",
+    "lesson_time", "classroom", "remark_text",
+)
+METADATA_FIELDS = ("course_name", "teacher_name", "lesson_time", "classroom", "remark_text")
+
+@dataclass
+class CourseEvent:
+    course_code: str
+    row: dict = field(repr=False)
+
+@dataclass
+class EnrollmentChanged(CourseEvent):
+    previous: int = None
+    enrolled: int = None
+    maximum: int = None
+
+@dataclass
+class SeatOpened(CourseEvent):
+    enrolled: int = None
+    maximum: int = None
+
+@dataclass
+class SeatClosed(CourseEvent):
+    enrolled: int = None
+    maximum: int = None
+
+@dataclass
+class MetadataChanged(CourseEvent):
+    changed_fields: tuple = ()
+
+def row_fingerprint(row):
+    return tuple(row.get(name) for name in FINGERPRINT_FIELDS)
+
+def has_seat(enrolled, maximum):
+    return enrolled is not None and maximum is not None and enrolled < maximum
+
+class ChangeDetector:
+    """
+    保存每門課程最後一次觀察到的資料指紋
+    資料沒有變化時回傳空列表，讓輪詢略過狀態更新；有變化時轉為具型別的事件
+    """
+
+    def __init__(self, get_capacity=None):
+        self.get_capacity = get_capacity
+        self.last = {}
+
+    def forget(self, course_code):
+        self.last.pop(course_code, None)
+
+    def _capacity(self, course_code, row):
+        maximum = row.get("max_students")
+        if maximum is None and self.get_capacity:
+            maximum = self.get_capacity(course_code)
+        return maximum
+
+    def observe(self, course_code, row):
+        fingerprint = row_fingerprint(row)
+        previous = self.last.get(course_code)
+        if previous == fingerprint:
+            return []
+        self.last[course_code] = fingerprint
+
+        enrolled = row.get("enrolled_students")
+        maximum = self._capacity(course_code, row)
+        if previous is None:
+            # 第一次觀察到這門課程
+            return [EnrollmentChanged(course_code, row, None, enrolled, maximum)]
+
+        before = dict(zip(FINGERPRINT_FIELDS, previous))
+        events = []
+        if before["enrolled_students"] != enrolled or before["max_students"] != row.get("max_students"):
+            events.append(EnrollmentChanged(course_code, row, before["enrolled_students"], enrolled, maximum))
+            previous_maximum = before["max_students"] if before["max_students"] is not None else maximum
+            was_open = has_seat(before["enrolled_students"], previous_maximum)
+            is_open = has_seat(enrolled, maximum)
+            if is_open and not was_open:
+                events.append(SeatOpened(course_code, row, enrolled, maximum))
+            elif was_open and not is_open:
+                events.append(SeatClosed(course_code, row, enrolled, maximum))
+        changed_fields = tuple(name for name in METADATA_FIELDS if before[name] != row.get(name))
+        if changed_fields:
+            events.append(MetadataChanged(course_code, row, changed_fields))
+        return events
+
+class EventBus:
+    """依事件型別訂閱的簡易事件匯流排"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def subscribe(self, event_type, handler):
+        self.handlers.append((event_type, handler))
+
+    async def publish(self, event):
+        for event_type, handler in self.handlers:
+            if isinstance(event, event_type):
+                try:
+                    await handler(event)
+                except Exception as e:
+                    debug_print(f"❌ 處理事件 {type(event).__name__} 時發生錯誤：{type(e).__name__}: {e}")
+
+    async def publish_all(self, events):
+        for event in events:
+            await self.publish(event)
@@ -0,0 +1,127 @@
+import asyncio
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from utils import debug_print
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    course_code TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    enrolled INTEGER,
+    maximum INTEGER
+);
+CREATE INDEX IF NOT EXISTS samples_course_ts ON samples (course_code, ts);
+"""
+
+class EnrollmentHistory:
+    """
+    選課人數歷史紀錄（SQLite，僅追加）
+    輪詢只把 (時間, 人數, 上限) 放進記憶體緩衝區，由背景工作定期批次寫入；
+    超過 raw_days 的資料降採樣為每小時一筆，超過 retention_days 的資料刪除
+    """
+
+    def __init__(self, path="history.db", raw_days=14, retention_days=180,
+                 flush_interval=5, compact_interval=3600):
+        self.path = path
+        self.raw_days = raw_days
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._buffer = []
+        self._last_compact = 0
+        self.stats = {"recorded": 0, "flushed": 0}
+
+    def close(self):
+        # 先等背景執行緒中的寫入或壓縮結束，才能在此執行緒使用同一個連線
+        self._executor.shutdown(wait=True)
+        if self._buffer:
+            self._insert(self._buffer)
+            self._buffer = []
+        self.conn.close()
+
+    def _submit(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def record(self, course_code, enrolled, maximum, ts=None):
+        """記錄一筆樣本（只寫入記憶體，不阻塞輪詢）"""
+        self._buffer.append((course_code, int(ts or time.time()), enrolled, maximum))
+        self.stats["recorded"] += 1
+
+    def _insert(self, samples):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO samples (course_code, ts, enrolled, maximum) VALUES (?, ?, ?, ?)",
+                samples,
+            )
+
+    def _compact(self, now):
+        raw_cutoff = now - self.raw_days * 86400
+        retention_cutoff = now - self.retention_days * 86400
+        with self.conn:
+            self.conn.execute("DELETE FROM samples WHERE ts < ?", (retention_cutoff,))
+            self.conn.execute(
+                """DELETE FROM samples WHERE ts < ? AND rowid NOT IN (
+                    SELECT MAX(rowid) FROM samples WHERE ts < ? GROUP BY course_code, ts / 3600
+                )""",
+                (raw_cutoff, raw_cutoff),
+            )
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        samples, self._buffer = self._buffer, []
+        await self._submit(self._insert, samples)
+        self.stats["flushed"] += len(samples)
+
+    async def run(self):
+        debug_print("🗂️ 選課人數歷史紀錄已啟動")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                now = time.time()
+                if now - self._last_compact >= self.compact_interval:
+                    await self._submit(self._compact, int(now))
+                    self._last_compact = now
+            except Exception as e:
+                debug_print(f"❌ 寫入選課人數歷史時發生錯誤：{type(e).__name__}: {e}")
+
+    def _query(self, course_code, since):
+        return self.conn.execute(
+            "SELECT ts, enrolled, maximum FROM samples WHERE course_code = ? AND ts >= ? ORDER BY ts",
+            (course_code, since),
+        ).fetchall()
+
+    async def samples(self, course_code, since):
+        """回傳 since（UNIX 秒）之後的樣本 [(ts, enrolled, maximum), ...]，含尚未寫入的緩衝資料"""
+        await self.flush()
+        return await self._submit(self._query, course_code, int(since))
+
+def summarize(samples):
+    """統計人數變動次數、範圍，以及名額釋出最常發生的時段（依小時）"""
+    changes = 0
+    opened_hours = Counter()
+    previous = None
+    for ts, enrolled, maximum in samples:
+        if previous is not None and enrolled != previous[1]:
+            changes += 1
+            was_full = previous[1] is not None and previous[2] is not None and previous[1] >= previous[2]
+            is_open = enrolled is not None and maximum is not None and enrolled < maximum
+            if was_full and is_open:
+                opened_hours[time.localtime(ts).tm_hour] += 1
+        previous = (ts, enrolled, maximum)
+    values = [enrolled for _, enrolled, _ in samples if enrolled is not None]
+    return {
+        "samples": len(samples),
+        "changes": changes,
+        "min": min(values) if values else None,
+        "max": max(values) if values else None,
+        "opened_hours": opened_hours.most_common(3),
+    }
@@ -0,0 +1,42 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from metrics import histogram
+from utils import debug_print
+
+class KeyedLocks:
+    """
+    依鍵（伺服器 ID 或課程）分開的鎖，並記錄等待時間與持有時間
+    鎖內只做記憶體中的狀態更新，網路與磁碟 I/O 一律在釋放鎖之後執行
+    """
+
+    def __init__(self, name, slow_threshold=0.1):
+        self.name = name
+        self.slow_threshold = slow_threshold
+        self._locks = {}
+        self.wait_histogram = histogram(f"lock_wait_{name}")
+        self.hold_histogram = histogram(f"lock_hold_{name}")
+
+    @asynccontextmanager
+    async def acquire(self, key):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        start = time.perf_counter()
+        async with lock:
+            acquired = time.perf_counter()
+            waited = acquired - start
+            self.wait_histogram.observe(waited)
+            if waited > self.slow_threshold:
+                debug_print(f"🐢 {self.name} 鎖 {key} 等待了 {waited:.3f}s")
+            try:
+                yield
+            finally:
+                held = time.perf_counter() - acquired
+                self.hold_histogram.observe(held)
+                if held > self.slow_threshold:
+                    debug_print(f"🐢 {self.name} 鎖 {key} 持有了 {held:.3f}s")
+
+    def discard(self, key):
+        """移除不再使用的鎖，避免已取消追蹤的課程累積"""
+        lock = self._locks.get(key)
+        if lock is not None and not lock.locked():
+            del self._locks[key]
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import resource
+import time
+from collections import deque
+from contextlib import contextmanager
+from aiohttp import web
+from utils import debug_print
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class LatencyHistogram:
+    """延遲直方圖：累計各區間次數，並保留最近的樣本以計算百分位數"""
+
+    def __init__(self, name, buckets=DEFAULT_BUCKETS, window=1000):
+        self.name = name
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def percentile(self, q):
+        """回傳最近樣本的第 q 百分位數（0~100），沒有樣本時回傳 None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self):
+        p50 = self.percentile(50)
+        p99 = self.percentile(99)
+        if p50 is None:
+            return f"{self.name}: 無資料"
+        return f"{self.name}: n={self.count} p50={p50:.3f}s p99={p99:.3f}s"
+
+histograms = {}
+counters = {}
+gauges = {}
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def histogram(name, labels=None, window=1000):
+    """取得（或建立）直方圖；labels 可區分同名的不同序列，例如各課程的輪詢延遲"""
+    key = (name, _label_key(labels))
+    if key not in histograms:
+        histograms[key] = LatencyHistogram(name, window=window)
+    return histograms[key]
+
+def remove_histogram(name, labels=None):
+    histograms.pop((name, _label_key(labels)), None)
+
+@contextmanager
+def timed(name, labels=None):
+    """記錄區塊執行時間到指定名稱的直方圖（可包住 await）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram(name, labels).observe(time.perf_counter() - start)
+
+def increment(name, labels=None, amount=1):
+    key = (name, _label_key(labels))
+    counters[key] = counters.get(key, 0) + amount
+
+def gauge(name, func):
+    """註冊在匯出時才讀取數值的量測值，func 回傳數字或 None"""
+    gauges[name] = func
+
+def _read_rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+def descendant_rss_bytes(exclude=()):
+    """
+    子孫行程（例如 Playwright 啟動的 Chromium）的 RSS 總和，無法讀取 /proc 時回傳 None
+    exclude 中的行程連同其子孫都不計入，例如 worker 行程與它們各自的瀏覽器
+    """
+    try:
+        children = {}
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # 行程名稱可能含空白，從最後一個 ")" 之後開始解析
+                    fields = f.read().rsplit(")", 1)[1].split()
+                children.setdefault(int(fields[1]), []).append(int(pid))
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        return None
+    descendants = []
+    frontier = [os.getpid()]
+    while frontier:
+        pids = [pid for pid in children.get(frontier.pop(), []) if pid not in exclude]
+        descendants.extend(pids)
+        frontier.extend(pids)
+    total = 0
+    for pid in descendants:
+        try:
+            total += _read_rss_kb(pid)
+        except OSError:
+            continue
+    return total * 1024
+
+def process_rss_bytes():
+    """目前行程的常駐記憶體（RSS），無法讀取 /proc 時改用 ru_maxrss"""
+    try:
+        return _read_rss_kb("self") * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class LoopLagMonitor:
+    """定期排程一個短暫的 sleep，以實際延遲量測事件迴圈的卡頓時間"""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.histogram = histogram("event_loop_lag")
+        self.current = 0.0
+        self.peak = 0.0
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.current = lag
+            self.peak = max(self.peak, lag)
+            self.histogram.observe(lag)
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + "}"
+
+def render_prometheus(prefix="ntust_bot"):
+    """以 Prometheus 文字格式匯出所有直方圖、計數器與量測值"""
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), hist in sorted(histograms.items()):
+        metric = f"{prefix}_{name}_seconds"
+        declare(metric, "histogram")
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.bucket_counts):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist.count}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {hist.total}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {hist.count}")
+
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"{prefix}_{name}"
+        declare(metric, "counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for name, func in sorted(gauges.items()):
+        try:
+            value = func()
+        except Exception as e:
+            debug_print(f"⚠️ 讀取量測值 {name} 失敗：{type(e).__name__}: {e}")
+            continue
+        if value is None:
+            continue
+        metric = f"{prefix}_{name}"
+        declare(metric, "gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """在本機提供 /metrics 的小型 HTTP 伺服器，供 Prometheus 抓取"""
+
+    def __init__(self, host="127.0.0.1", port=9100):
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def handle_metrics(self, request):
+        return web.Response(text=render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        if self.runner:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        debug_print(f"📈 量測端點已啟動：http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from metrics import histogram, timed
+from utils import debug_print
+
+MESSAGE_LIMIT = 2000
+
+def chunk_lines(lines, limit=MESSAGE_LIMIT):
+    """將多行文字合併成不超過 limit 字元的訊息，單行過長時盡量在空白處切開"""
+    chunks = []
+    current = ""
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            cut = line.rfind(" ", 0, limit)
+            if cut <= 0:
+                cut = limit
+            chunks.append(line[:cut])
+            line = line[cut:].lstrip(" ")
+        if len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ""
+        current += line + "\n"
+    if current:
+        chunks.append(current)
+    return chunks
+
+class NotificationDispatcher:
+    """
+    集中的通知發送佇列，每個頻道各自一個佇列
+    每個 tick 把同一頻道的名額通知與定期提醒合併成最少的訊息，提及的使用者去重後放在開頭，
+    並依每個頻道的最短發送間隔發送，避免觸發 Discord 的速率限制
+    """
+
+    def __init__(self, get_channel, tick=1.0, min_send_interval=1.0, limit=MESSAGE_LIMIT):
+        self.get_channel = get_channel
+        self.tick = tick
+        self.min_send_interval = min_send_interval
+        self.limit = limit
+        self._pending = {}
+        self._senders = {}
+        self._last_send = {}
+        self.latency = histogram("notify_delivery_latency")
+        self.stats = {"enqueued": 0, "coalesced": 0, "messages_sent": 0, "send_errors": 0}
+
+    def queue_depth(self):
+        return sum(len(items) for items in self._pending.values())
+
+    def enqueue(self, channel_id, mentions, text, key=None, priority=0):
+        """
+        排入一則通知；同一頻道同一 key 的通知在同一個 tick 只保留優先度最高的一則
+        """
+        if not channel_id:
+            return
+        items = self._pending.setdefault(channel_id, {})
+        item_key = key if key is not None else object()
+        existing = items.get(item_key)
+        self.stats["enqueued"] += 1
+        if existing is not None:
+            self.stats["coalesced"] += 1
+            if existing["priority"] > priority:
+                existing["mentions"].update(mentions)
+                return
+            mentions = set(mentions) | existing["mentions"]
+        items[item_key] = {
+            "mentions": set(mentions),
+            "text": text,
+            "priority": priority,
+            "queued_at": existing["queued_at"] if existing else time.perf_counter(),
+        }
+
+    def build_messages(self, items):
+        """將同一頻道的通知合併成訊息，提及的使用者去重後放在最前面"""
+        mentions = sorted(set().union(*(item["mentions"] for item in items)))
+        lines = []
+        if mentions:
+            lines.append(" ".join(f"<@{user_id}>" for user_id in mentions))
+        lines.extend(item["text"] for item in items)
+        return chunk_lines(lines, self.limit)
+
+    async def _send_channel(self, channel_id, items):
+        channel = self.get_channel(channel_id)
+        if channel is None:
+            debug_print(f"⚠️ 找不到通知頻道 {channel_id}，捨棄 {len(items)} 則通知")
+            return
+        messages = self.build_messages(items)
+        debug_print(f"📤 發送 {len(items)} 則通知到頻道 #{channel.name} ({channel.id})，合併為 {len(messages)} 則訊息")
+        for message in messages:
+            wait = self._last_send.get(channel_id, 0) + self.min_send_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                with timed("notify_send"):
+                    await channel.send(message)
+                self.stats["messages_sent"] += 1
+            except Exception as e:
+                self.stats["send_errors"] += 1
+                debug_print(f"❌ 發送通知到頻道 {channel_id} 失敗：{type(e).__name__}: {e}")
+            self._last_send[channel_id] = time.monotonic()
+        now = time.perf_counter()
+        for item in items:
+            self.latency.observe(now - item["queued_at"])
+
+    def flush(self):
+        """為每個有待發送通知且目前沒有在發送的頻道啟動發送工作"""
+        for channel_id in list(self._pending):
+            sender = self._senders.get(channel_id)
+            if sender is not None and not sender.done():
+                # 上一批還在發送，這一批留到下一個 tick 合併
+                continue
+            items = list(self._pending.pop(channel_id).values())
+            if items:
+                self._senders[channel_id] = asyncio.create_task(self._send_channel(channel_id, items))
+
+    async def run(self):
+        debug_print("📬 通知佇列已啟動")
+        while True:
+            self.flush()
+            await asyncio.sleep(self.tick)
@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from utils import debug_print
+
+class PagePool:
+    """
+    固定大小的瀏覽器頁面池
+    每個 worker 持有一個頁面，工作依伺服器輪流（round-robin）取出執行，
+    追蹤的課程再多，開啟的頁面數量也固定為 size；
+    每個頁面執行 max_jobs 個工作後重建，避免長時間執行時記憶體持續增長
+    """
+
+    def __init__(self, context, size=2, job_timeout=60, max_jobs=0):
+        self.context = context
+        self.size = size
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.generation = 0
+        self._jobs = {}
+        self._keys = asyncio.Queue()
+        self._workers = []
+        self._pages = {}
+        self._page_generation = {}
+        self.stats = {"jobs": 0, "timeouts": 0, "errors": 0, "pages_created": 0, "pages_recycled": 0, "contexts_replaced": 0}
+
+    async def start(self):
+        if self._workers:
+            return
+        for index in range(self.size):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        debug_print(f"🧰 頁面池已啟動，大小 {self.size}")
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def replace_context(self, context):
+        """
+        換用新的瀏覽器 context：worker 在下一個工作前改用新 context 建立頁面，
+        舊 context 等所有頁面都換過（或逾時）後關閉
+        """
+        old_context, self.context = self.context, context
+        self.generation += 1
+        self.stats["contexts_replaced"] += 1
+        debug_print(f"♻️ 頁面池換用新的瀏覽器 context（第 {self.generation} 代）")
+        generation = self.generation
+        deadline = asyncio.get_running_loop().time() + self.job_timeout
+        while asyncio.get_running_loop().time() < deadline:
+            if all(page.is_closed() or self._page_generation.get(index) == generation
+                   for index, page in self._pages.items()):
+                break
+            await asyncio.sleep(1)
+        try:
+            await old_context.close()
+        except Exception as e:
+            debug_print(f"⚠️ 關閉舊的瀏覽器 context 失敗：{type(e).__name__}: {e}")
+
+    async def _close_page(self, page):
+        if page and not page.is_closed():
+            try:
+                await page.close()
+            except Exception:
+                pass
+
+    def open_pages(self):
+        return sum(1 for page in self._pages.values() if not page.is_closed())
+
+    def pending(self):
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+    async def run(self, job, key=None, timeout=None):
+        """
+        排入工作並等待結果，job 為 async def job(page)
+        key 通常為伺服器 ID，用於在不同伺服器之間公平分配頁面
+        """
+        future = asyncio.get_running_loop().create_future()
+        if key not in self._jobs:
+            self._jobs[key] = deque()
+            self._keys.put_nowait(key)
+        self._jobs[key].append((job, timeout or self.job_timeout, future))
+        return await future
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        self.stats["pages_created"] += 1
+        return page
+
+    async def _next_job(self):
+        key = await self._keys.get()
+        jobs = self._jobs[key]
+        job = jobs.popleft()
+        if jobs:
+            # 同一伺服器還有工作，排到隊伍最後面讓其他伺服器先執行
+            self._keys.put_nowait(key)
+        else:
+            del self._jobs[key]
+        return job
+
+    async def _worker(self, index):
+        page = None
+        page_jobs = 0
+        while True:
+            job, timeout, future = await self._next_job()
+            if future.cancelled():
+                continue
+            try:
+                if page is not None and (
+                    self._page_generation.get(index) != self.generation
+                    or (self.max_jobs and page_jobs >= self.max_jobs)
+                ):
+                    self.stats["pages_recycled"] += 1
+                    await self._close_page(page)
+                    page = None
+                if page is None or page.is_closed():
+                    page = await self._new_page()
+                    page_jobs = 0
+                    self._pages[index] = page
+                    self._page_generation[index] = self.generation
+                page_jobs += 1
+                result = await asyncio.wait_for(job(page), timeout)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                if page and not page.is_closed():
+                    await page.close()
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.stats["timeouts"] += 1
+                    debug_print(f"⏱️ 頁面池 worker {index} 工作逾時 ({timeout}s)，重建頁面")
+                else:
+                    self.stats["errors"] += 1
+                    debug_print(f"❌ 頁面池 worker {index} 工作失敗：{type(e).__name__}: {e}")
+                # 頁面可能停在未知狀態，關閉後下一個工作重新建立
+                await self._close_page(page)
+                page = None
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self.stats["jobs"] += 1
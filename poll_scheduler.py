@@ -0,0 +1,299 @@
+import asyncio
+import datetime
+import random
+import re
+import time
+from collections import defaultdict
+from metrics import histogram, increment, remove_histogram
+from utils import debug_print
+
+def department_prefix(course_code):
+    """取得課程代碼的系所前綴，例如 CS1001301 -> CS"""
+    match = re.match(r'[A-Za-z]+', course_code)
+    return match.group().upper() if match else course_code[:2]
+
+def group_course_codes(course_codes, batch=True, full_query_threshold=8):
+    """
+    將課程代碼分組成最少的搜尋關鍵字，回傳 {keyword: set(course_codes)}
+    同一系所多門課合併為前綴查詢；系所數過多時改用空關鍵字查詢整學期
+    """
+    course_codes = set(course_codes)
+    if not batch:
+        return {code: {code} for code in course_codes}
+
+    by_prefix = defaultdict(set)
+    for code in course_codes:
+        by_prefix[department_prefix(code)].add(code)
+
+    if full_query_threshold and len(by_prefix) > full_query_threshold:
+        return {"": course_codes}
+
+    groups = {}
+    for prefix, codes in by_prefix.items():
+        if len(codes) == 1:
+            code = next(iter(codes))
+            groups[code] = {code}
+        else:
+            groups[prefix] = codes
+    return groups
+
+def parse_selection_windows(text):
+    """
+    解析選課期間設定，格式為 "2026-09-01 09:00~2026-09-12 17:00;..."
+    回傳 [(start, end), ...]，格式錯誤的區段會被略過
+    """
+    windows = []
+    for part in (text or "").split(";"):
+        if "~" not in part:
+            continue
+        start, end = part.split("~", 1)
+        try:
+            windows.append((
+                datetime.datetime.fromisoformat(start.strip()),
+                datetime.datetime.fromisoformat(end.strip()),
+            ))
+        except ValueError:
+            debug_print(f"⚠️ 無法解析選課期間設定: {part}")
+    return windows
+
+class PollScheduler:
+    """
+    集中式自適應輪詢排程器
+    每門課程有各自的輪詢間隔：接近額滿、人數剛變動或在選課期間內的課程輪詢得較頻繁，
+    穩定的課程以指數退避拉長間隔。到期的課程去重、分組後批次查詢，
+    並受全域每秒查詢次數預算限制，結果分送給每個訂閱的伺服器；
+    設定 detector 時，資料沒有變化的課程不會分送，只交給 on_unchanged
+    """
+
+    def __init__(self, search, get_subscriptions, on_row, interval=10,
+                 batch=True, concurrency=4, full_query_threshold=8,
+                 min_interval=3, max_interval=120, backoff=2.0, jitter=0.2,
+                 rate_limit=2.0, pressure_seats=3, recent_change=600,
+                 selection_windows=(), get_capacity=None, tick=1.0,
+                 detector=None, on_events=None, on_unchanged=None):
+        self.search = search
+        self.get_subscriptions = get_subscriptions
+        self.on_row = on_row
+        self.interval = interval
+        self.batch = batch
+        self.concurrency = concurrency
+        self.full_query_threshold = full_query_threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.pressure_seats = pressure_seats
+        self.recent_change = recent_change
+        self.selection_windows = list(selection_windows)
+        self.get_capacity = get_capacity
+        self.tick = tick
+        self.detector = detector
+        self.on_events = on_events
+        self.on_unchanged = on_unchanged
+        self.courses = {}
+        self._tokens = max(1.0, rate_limit)
+        self._last_refill = time.monotonic()
+        self.stats = {
+            "cycles": 0,
+            "subscriptions": 0,
+            "distinct_courses": 0,
+            "requests": 0,
+            "saved_requests": 0,
+            "deferred_groups": 0,
+            "unchanged_rows": 0,
+        }
+
+    def in_selection_window(self, now=None):
+        now = now or datetime.datetime.now()
+        return any(start <= now <= end for start, end in self.selection_windows)
+
+    def _new_state(self, now):
+        return {
+            "interval": self.interval,
+            "next_due": now,
+            "enrolled": None,
+            "last_change": None,
+            "polled": False,
+        }
+
+    def _sync_courses(self, subscriptions):
+        now = time.monotonic()
+        for course_code in subscriptions:
+            if course_code not in self.courses:
+                # 新加入的課程立即輪詢
+                self.courses[course_code] = self._new_state(now)
+        for course_code in list(self.courses):
+            if course_code not in subscriptions:
+                del self.courses[course_code]
+                remove_histogram("course_poll_latency", {"course": course_code})
+                if self.detector:
+                    self.detector.forget(course_code)
+
+    def _refill_tokens(self):
+        now = time.monotonic()
+        burst = max(1.0, self.rate_limit)
+        self._tokens = min(burst, self._tokens + (now - self._last_refill) * self.rate_limit)
+        self._last_refill = now
+
+    def _take_budget(self, groups):
+        """依最久未輪詢的順序取出預算內可查詢的分組，其餘留到下一輪"""
+        self._refill_tokens()
+        ordered = sorted(groups.items(), key=lambda item: min(self.courses[code]["next_due"] for code in item[1]))
+        allowed = {}
+        for keyword, codes in ordered:
+            if self._tokens < 1:
+                self.stats["deferred_groups"] += 1
+                continue
+            self._tokens -= 1
+            allowed[keyword] = codes
+        return allowed
+
+    def next_interval(self, course_code, row):
+        """依名額壓力、近期變動與選課期間計算課程的下一次輪詢間隔"""
+        state = self.courses[course_code]
+        now = time.monotonic()
+        enrolled = row.get("enrolled_students") if row else None
+        maximum = row.get("max_students") if row else None
+        if maximum is None and self.get_capacity:
+            maximum = self.get_capacity(course_code)
+
+        if enrolled is not None and state["enrolled"] is not None and enrolled != state["enrolled"]:
+            state["last_change"] = now
+        if enrolled is not None:
+            state["enrolled"] = enrolled
+
+        near_full = (
+            enrolled is not None and maximum is not None
+            and maximum - enrolled <= self.pressure_seats
+        )
+        recently_changed = state["last_change"] is not None and now - state["last_change"] < self.recent_change
+        if near_full or recently_changed:
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, max(self.interval, state["interval"] * self.backoff))
+        if self.in_selection_window():
+            interval = min(interval, self.interval)
+        return interval
+
+    def coverage(self):
+        """回傳 (已成功取得資料的課程數, 追蹤中的課程數)"""
+        return sum(1 for state in self.courses.values() if state["polled"]), len(self.courses)
+
+    def _reschedule(self, course_code, row):
+        state = self.courses[course_code]
+        if row is not None:
+            state["polled"] = True
+        state["interval"] = self.next_interval(course_code, row)
+        spread = state["interval"] * self.jitter
+        state["next_due"] = time.monotonic() + state["interval"] + random.uniform(-spread, spread)
+
+    def schedule_known(self, course_code, row):
+        """
+        /add 剛查詢過的新課程：以該次查詢的資料建立輪詢狀態並排定下一次輪詢，
+        不必在加入後立即再查詢一次；已在輪詢或沒有人數資料時不做任何事
+        """
+        if course_code in self.courses or row is None or row.get("enrolled_students") is None:
+            return
+        self.courses[course_code] = self._new_state(time.monotonic())
+        self._reschedule(course_code, row)
+
+    async def _search_group(self, keyword, codes, wanted, semaphore):
+        """查詢一個分組：延遲只記在該分組的課程上，回傳的資料列則包含 wanted 中所有順便取得的課程"""
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                rows = await self.search(keyword)
+            except Exception as e:
+                debug_print(f"❌ 批次查詢 '{keyword}' 時發生錯誤：{type(e).__name__}: {e}")
+                increment("scrape_failures_total", {"exception": type(e).__name__})
+                return {}
+            finally:
+                self.stats["requests"] += 1
+            elapsed = time.perf_counter() - start
+            for code in codes:
+                histogram("course_poll_latency", {"course": code}, window=100).observe(elapsed)
+        return {row["course_code"]: row for row in rows if row["course_code"] in wanted}
+
+    async def deliver(self, course_code, row, guild_ids):
+        """將一筆課程資料交給變更偵測與各訂閱伺服器，回傳更新的訂閱數"""
+        if self.detector:
+            events = self.detector.observe(course_code, row)
+            if not events:
+                # 資料與上次相同，不需更新任何伺服器的狀態
+                self.stats["unchanged_rows"] += 1
+                if self.on_unchanged:
+                    self.on_unchanged(course_code, row)
+                return 0
+            if self.on_events:
+                await self.on_events(events)
+        count = 0
+        for guild_id in guild_ids:
+            count += 1
+            try:
+                await self.on_row(guild_id, course_code, row)
+            except Exception as e:
+                debug_print(f"❌ 處理課程 {course_code} 時發生錯誤：{type(e).__name__}: {e}")
+        return count
+
+    async def poll_once(self):
+        """查詢所有到期的課程，回傳本輪的查詢次數"""
+        subscriptions = self.get_subscriptions()
+        self._sync_courses(subscriptions)
+        if not subscriptions:
+            return 0
+
+        now = time.monotonic()
+        due = [code for code in subscriptions if self.courses[code]["next_due"] <= now]
+        if not due:
+            return 0
+
+        groups = self._take_budget(group_course_codes(due, self.batch, self.full_query_threshold))
+        if not groups:
+            return 0
+
+        # 前綴或整學期查詢順便取得的其他追蹤課程，也一併更新
+        semaphore = asyncio.Semaphore(self.concurrency)
+        wanted = set(subscriptions)
+        results = await asyncio.gather(*(
+            self._search_group(keyword, codes, wanted, semaphore) for keyword, codes in groups.items()
+        ))
+        rows = {}
+        for result in results:
+            rows.update(result)
+
+        polled = set().union(*groups.values())
+        # covered 為本輪取得資料的訂閱數（不論是否有變化），updated 為實際更新的訂閱數
+        covered = updated = 0
+        for course_code in polled | set(rows):
+            if course_code not in self.courses:
+                continue
+            row = rows.get(course_code)
+            self._reschedule(course_code, row)
+            if row is None:
+                debug_print(f"⚠️ 追蹤中，未找到課程 {course_code}，將重試")
+                continue
+            covered += len(subscriptions[course_code])
+            updated += await self.deliver(course_code, row, subscriptions[course_code])
+
+        self.stats["cycles"] += 1
+        self.stats["subscriptions"] = sum(len(guild_ids) for guild_ids in subscriptions.values())
+        self.stats["distinct_courses"] = len(subscriptions)
+        self.stats["saved_requests"] += max(0, covered - len(groups))
+        debug_print(
+            f"📊 輪詢完成：涵蓋 {covered} 個訂閱（更新 {updated} 個） / {len(rows)} 門課程 / "
+            f"{len(groups)} 次查詢（累計節省 {self.stats['saved_requests']} 次）"
+        )
+        return len(groups)
+
+    async def run(self):
+        debug_print("🔄 開始集中輪詢課程")
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                debug_print("⏹️ 輪詢排程已被取消")
+                raise
+            except Exception as e:
+                debug_print(f"❌ 輪詢時發生錯誤：{type(e).__name__}: {e}")
+            await asyncio.sleep(self.tick)
@@ -0,0 +1,43 @@
+from metrics import timed
+
+SEARCH_API_PATH = "/querycourse/api/courses"
+
+# 表格第一列符合關鍵字或顯示「無資料」；關鍵字與上次相同時舊的表格也會符合，
+# 因此只用來確認詳細資訊按鈕所在的表格已顯示，資料一律取自搜尋 API 的回應
+ROWS_READY_JS = """(keyword) => {
+    let rows = document.querySelectorAll(".v-datatable tbody tr");
+    if (!rows.length) return false;
+    let cols = rows[0].querySelectorAll("td");
+    if (cols.length <= 1) return true;
+    return cols[0].innerText.trim().startsWith(keyword);
+}"""
+
+DIALOG_READY_JS = """() => {
+    let dialog = document.querySelector(".v-dialog--active");
+    return !!(dialog && /\\d/.test(dialog.innerText));
+}"""
+
+def is_search_response(response):
+    return SEARCH_API_PATH in response.url and response.request.method == "POST"
+
+async def load_query_page(page, url, timeout=30000):
+    """載入查詢網站，等到搜尋輸入框出現即可使用，不等待 networkidle"""
+    with timed("page_load"):
+        await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+        await page.wait_for_selector("input[type='text']", timeout=timeout)
+
+async def submit_search(page, keyword, timeout=15000):
+    """輸入關鍵字送出搜尋，等待這次搜尋 API 的回應完整讀取並回傳其 JSON，再等待表格顯示結果"""
+    with timed("search"):
+        await page.fill("input[type='text']", keyword)
+        async with page.expect_response(is_search_response, timeout=timeout) as response_info:
+            await page.press("input[type='text']", "Enter")
+        response = await response_info.value
+        data = await response.json()
+        await page.wait_for_function(ROWS_READY_JS, arg=keyword, timeout=timeout)
+    return data or []
+
+async def wait_for_detail_dialog(page, timeout=10000):
+    """等待課程詳細資訊視窗出現並載入內容"""
+    with timed("detail_dialog"):
+        await page.wait_for_function(DIALOG_READY_JS, timeout=timeout)
@@ -0,0 +1,299 @@
+import asyncio
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from utils import debug_print
+
+class HashRing:
+    """一致性雜湊環：新增或移除 worker 時，只有約 1/N 的課程需要換手"""
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self._keys = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], "big")
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}#{replica}")
+            if key not in self._nodes:
+                bisect.insort(self._keys, key)
+                self._nodes[key] = node
+
+    def remove(self, node):
+        for replica in range(self.replicas):
+            key = self._hash(f"{node}#{replica}")
+            if self._nodes.get(key) == node:
+                del self._nodes[key]
+                self._keys.remove(key)
+
+    def nodes(self):
+        return set(self._nodes.values())
+
+    def node_for(self, value):
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(value)) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+def run_worker(worker_id, config, commands, results):
+    """worker 行程進入點：以自己的 HTTP 客戶端或瀏覽器輪詢分配到的課程"""
+    try:
+        asyncio.run(_worker_main(worker_id, config, commands, results))
+    except KeyboardInterrupt:
+        pass
+
+async def _worker_main(worker_id, config, commands, results):
+    from course_api import CourseApiClient
+    from events import ChangeDetector
+    from poll_scheduler import PollScheduler, parse_selection_windows
+
+    assigned = {}
+    parent = os.getppid()
+    client = None
+    browser = None
+    pool = None
+
+    if config["backend"] == "playwright":
+        from playwright.async_api import async_playwright
+        from page_pool import PagePool
+        from course_page import search_on_page
+        playwright = await async_playwright().start()
+        browser = await playwright.chromium.launch(headless=True)
+        pool = PagePool(await browser.new_context(), config["page_pool_size"], config["page_job_timeout"],
+                        config["page_max_jobs"])
+        await pool.start()
+
+        async def search(keyword):
+            return await pool.run(lambda page: search_on_page(page, config["query_url"], keyword))
+    else:
+        client = CourseApiClient(base_url=config["api_url"], semester=config["semester"])
+        search = client.search
+
+    async def send_row(_, course_code, row):
+        results.put(("row", worker_id, course_code, row))
+
+    # 沒有變化的課程只回報代碼，隨心跳一併送出，讓協調者延長快取期限
+    unchanged = set()
+
+    scheduler = PollScheduler(
+        search,
+        lambda: {course_code: [None] for course_code in assigned},
+        send_row,
+        interval=config["interval"],
+        batch=config["backend"] != "playwright",
+        concurrency=config["concurrency"],
+        min_interval=config["min_interval"],
+        max_interval=config["max_interval"],
+        jitter=config["jitter"],
+        rate_limit=config["rate_limit"],
+        pressure_seats=config["pressure_seats"],
+        selection_windows=parse_selection_windows(config["selection_windows"]),
+        get_capacity=assigned.get,
+        # 只把有變化的資料傳回協調者，減少 IPC 流量
+        detector=ChangeDetector(assigned.get),
+        on_unchanged=lambda course_code, row: unchanged.add(course_code),
+    )
+    poll_task = asyncio.create_task(scheduler.run())
+    results.put(("ready", worker_id, os.getpid()))
+    debug_print(f"🧩 worker {worker_id} 已啟動 (pid {os.getpid()})")
+    try:
+        while os.getppid() == parent:
+            try:
+                while True:
+                    command, payload = commands.get_nowait()
+                    if command == "assign":
+                        assigned.clear()
+                        assigned.update(payload)
+                    elif command == "stop":
+                        return
+            except queue.Empty:
+                pass
+            results.put(("heartbeat", worker_id, dict(scheduler.stats, courses=len(assigned)), tuple(unchanged)))
+            unchanged.clear()
+            await asyncio.sleep(config["tick"])
+    finally:
+        poll_task.cancel()
+        await asyncio.gather(poll_task, return_exceptions=True)
+        if client:
+            await client.close()
+        if pool:
+            await pool.close()
+        if browser:
+            await browser.close()
+
+class ShardCoordinator:
+    """
+    協調者：Discord 行程保留追蹤資料與指令，課程輪詢交給多個 worker 行程
+    課程代碼以一致性雜湊分配給 worker，worker 透過 multiprocessing 佇列回傳有變化的課程資料；
+    worker 加入或停止回應時重新分配，停止的 worker 會以退避間隔重新啟動
+    """
+
+    def __init__(self, get_subscriptions, get_capacity, deliver, forget, config,
+                 workers=2, tick=1.0, heartbeat_timeout=30, restart_backoff=5.0, on_unchanged=None):
+        self.get_subscriptions = get_subscriptions
+        self.get_capacity = get_capacity
+        self.deliver = deliver
+        self.forget = forget
+        self.on_unchanged = on_unchanged
+        self.config = dict(config, tick=tick)
+        self.size = workers
+        self.tick = tick
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restart_backoff = restart_backoff
+        self.ring = HashRing()
+        self.workers = {}
+        self._context = multiprocessing.get_context("spawn")
+        self.results = self._context.Queue()
+        self._assigned = {}
+        self._known = set()
+        self._covered = set()
+        self._restart_at = {}
+        self.stats = {"rows": 0, "rebalances": 0, "restarts": 0}
+
+    def coverage(self):
+        """回傳 (已收到資料的課程數, 追蹤中的課程數)"""
+        return len(self._known & self._covered), len(self._known)
+
+    def alive(self):
+        return len(self.ring.nodes())
+
+    def _spawn(self, worker_id):
+        commands = self._context.Queue()
+        process = self._context.Process(
+            target=run_worker,
+            args=(worker_id, self.config, commands, self.results),
+            name=f"course-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[worker_id] = {
+            "process": process,
+            "commands": commands,
+            "last_seen": time.monotonic(),
+            "stats": {},
+        }
+        debug_print(f"🧩 啟動 worker {worker_id} (pid {process.pid})")
+
+    def start(self):
+        for worker_id in range(self.size):
+            if worker_id not in self.workers:
+                self._spawn(worker_id)
+
+    def _remove(self, worker_id, reason):
+        worker = self.workers.pop(worker_id)
+        debug_print(f"⚠️ worker {worker_id} {reason}，重新分配其課程")
+        if worker["process"].is_alive():
+            worker["process"].terminate()
+        self.ring.remove(worker_id)
+        self._assigned.pop(worker_id, None)
+        self._restart_at[worker_id] = time.monotonic() + self.restart_backoff
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker_id, worker in list(self.workers.items()):
+            if not worker["process"].is_alive():
+                self._remove(worker_id, f"已結束 (exit code {worker['process'].exitcode})")
+            elif now - worker["last_seen"] > self.heartbeat_timeout:
+                self._remove(worker_id, f"超過 {self.heartbeat_timeout} 秒沒有回應")
+        for worker_id, restart_at in list(self._restart_at.items()):
+            if now >= restart_at:
+                del self._restart_at[worker_id]
+                self.stats["restarts"] += 1
+                self._spawn(worker_id)
+
+    def _rebalance(self, subscriptions):
+        """依雜湊環計算每個 worker 的課程，只對分配有變動的 worker 送出新的清單"""
+        for course_code in self._known - set(subscriptions):
+            self.forget(course_code)
+            self._covered.discard(course_code)
+        self._known = set(subscriptions)
+
+        assignments = {worker_id: {} for worker_id in self.ring.nodes()}
+        for course_code in subscriptions:
+            worker_id = self.ring.node_for(course_code)
+            if worker_id is not None:
+                assignments[worker_id][course_code] = self.get_capacity(course_code)
+        changed = False
+        for worker_id, assignment in assignments.items():
+            if self._assigned.get(worker_id) != assignment:
+                self.workers[worker_id]["commands"].put(("assign", assignment))
+                self._assigned[worker_id] = assignment
+                changed = True
+        if changed:
+            self.stats["rebalances"] += 1
+
+    async def _handle(self, message, subscriptions):
+        kind, worker_id = message[0], message[1]
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            return
+        worker["last_seen"] = time.monotonic()
+        if kind == "ready":
+            # 新的 worker 加入雜湊環，部分課程會在下次分配時移交給它
+            self.ring.add(worker_id)
+            self._assigned.pop(worker_id, None)
+            debug_print(f"🧩 worker {worker_id} 加入 (目前 {self.alive()} 個)")
+        elif kind == "heartbeat":
+            worker["stats"] = message[2]
+            for course_code in message[3]:
+                if course_code in subscriptions and self.ring.node_for(course_code) == worker_id:
+                    self._covered.add(course_code)
+                    if self.on_unchanged:
+                        self.on_unchanged(course_code, None)
+        elif kind == "row":
+            _, _, course_code, row = message
+            guild_ids = subscriptions.get(course_code)
+            if guild_ids and self.ring.node_for(course_code) == worker_id:
+                self.stats["rows"] += 1
+                self._covered.add(course_code)
+                await self.deliver(course_code, row, guild_ids)
+
+    async def _drain(self, subscriptions):
+        """等待 worker 的訊息最多 tick 秒，取得後把佇列中其餘的訊息一併處理"""
+        try:
+            message = await asyncio.to_thread(self.results.get, True, self.tick)
+        except queue.Empty:
+            return
+        await self._handle(message, subscriptions)
+        while True:
+            try:
+                message = self.results.get_nowait()
+            except queue.Empty:
+                return
+            await self._handle(message, subscriptions)
+
+    async def run(self):
+        debug_print(f"🧩 以 {self.size} 個 worker 行程分散輪詢課程")
+        self.start()
+        while True:
+            try:
+                self._check_workers()
+                subscriptions = self.get_subscriptions()
+                self._rebalance(subscriptions)
+                await self._drain(subscriptions)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                debug_print(f"❌ 協調 worker 時發生錯誤：{type(e).__name__}: {e}")
+                await asyncio.sleep(self.tick)
+
+    def close(self):
+        for worker in self.workers.values():
+            try:
+                worker["commands"].put(("stop", None))
+            except (OSError, ValueError):
+                pass
+        for worker in self.workers.values():
+            worker["process"].join(timeout=5)
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        self.workers = {}
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from utils import debug_print
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    guild_id INTEGER NOT NULL,
+    course_code TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, course_code)
+);
+CREATE TABLE IF NOT EXISTS guild_channels (
+    guild_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def serialize_course(info):
+    return json.dumps({**info, "followers": list(info["followers"])}, ensure_ascii=False)
+
+def deserialize_course(text):
+    info = json.loads(text)
+    info["followers"] = set(info["followers"])
+    return info
+
+class CourseStore:
+    """
+    以 SQLite（WAL 模式）儲存追蹤資料
+    每次寫入只更新變動的單筆資料，並在獨立的執行緒中以交易提交，不阻塞事件迴圈
+    """
+
+    def __init__(self, path="courses.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # 單一執行緒依序執行寫入，確保順序且不需額外上鎖
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="course-store")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.conn.close()
+
+    def _submit(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _execute(self, sql, params):
+        with self.conn:
+            self.conn.execute(sql, params)
+
+    def load(self):
+        """載入全部追蹤資料，回傳 (tracked_courses, guild_channels)"""
+        tracked_courses = {}
+        for guild_id, course_code, data in self.conn.execute("SELECT guild_id, course_code, data FROM courses"):
+            tracked_courses.setdefault(guild_id, {})[course_code] = deserialize_course(data)
+        guild_channels = dict(self.conn.execute("SELECT guild_id, channel_id FROM guild_channels"))
+        return tracked_courses, guild_channels
+
+    def is_empty(self):
+        courses = self.conn.execute("SELECT COUNT(*) FROM courses").fetchone()[0]
+        channels = self.conn.execute("SELECT COUNT(*) FROM guild_channels").fetchone()[0]
+        return courses == 0 and channels == 0
+
+    def migrate_json(self, json_path):
+        """
+        從舊版 courses.json 匯入資料（僅在資料庫為空時執行）
+        匯入在單一交易內完成，成功後將原檔更名為 .migrated 保留備份
+        """
+        if not os.path.exists(json_path) or not self.is_empty():
+            return False
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self.conn:
+            for gid, courses in data.get("tracked_courses", {}).items():
+                for code, info in courses.items():
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO courses (guild_id, course_code, data) VALUES (?, ?, ?)",
+                        (int(gid), code, serialize_course(info)),
+                    )
+            for gid, channel_id in data.get("guild_channels", {}).items():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO guild_channels (guild_id, channel_id) VALUES (?, ?)",
+                    (int(gid), channel_id),
+                )
+        os.replace(json_path, json_path + ".migrated")
+        debug_print(f"📦 已將 {json_path} 匯入 {self.path}")
+        return True
+
+    def save_course(self, guild_id, course_code, info):
+        """寫入單一課程，資料在呼叫當下序列化，回傳可 await 的寫入結果"""
+        return self._submit(
+            self._execute,
+            "INSERT OR REPLACE INTO courses (guild_id, course_code, data) VALUES (?, ?, ?)",
+            (guild_id, course_code, serialize_course(info)),
+        )
+
+    def delete_course(self, guild_id, course_code):
+        return self._submit(
+            self._execute,
+            "DELETE FROM courses WHERE guild_id = ? AND course_code = ?",
+            (guild_id, course_code),
+        )
+
+    def set_channel(self, guild_id, channel_id):
+        return self._submit(
+            self._execute,
+            "INSERT OR REPLACE INTO guild_channels (guild_id, channel_id) VALUES (?, ?)",
+            (guild_id, channel_id),
+        )
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        return self._submit(
+            self._execute,
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, value),
+        )
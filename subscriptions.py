@@ -0,0 +1,59 @@
+class SubscriptionIndex:
+    """
+    全域的訂閱索引，與 tracked_courses（伺服器 → 課程 → 追蹤者）同步維護
+    課程 → 追蹤的伺服器，以及使用者 → (伺服器, 課程) 的反向查詢，
+    不需要掃描所有伺服器；輪詢依此去重，每個課程代碼只輪詢一次
+    """
+
+    def __init__(self):
+        self.by_course = {}
+        self.by_user = {}
+
+    def rebuild(self, tracked_courses):
+        self.by_course = {}
+        self.by_user = {}
+        for guild_id, courses in tracked_courses.items():
+            for course_code, info in courses.items():
+                self.by_course.setdefault(course_code, set()).add(guild_id)
+                for user_id in info["followers"]:
+                    self.by_user.setdefault(user_id, set()).add((guild_id, course_code))
+
+    def follow(self, guild_id, course_code, user_id):
+        self.by_course.setdefault(course_code, set()).add(guild_id)
+        self.by_user.setdefault(user_id, set()).add((guild_id, course_code))
+
+    def unfollow(self, guild_id, course_code, user_id):
+        follows = self.by_user.get(user_id)
+        if follows is not None:
+            follows.discard((guild_id, course_code))
+            if not follows:
+                del self.by_user[user_id]
+
+    def drop(self, guild_id, course_code):
+        """伺服器不再追蹤該課程（最後一位追蹤者取消）"""
+        guild_ids = self.by_course.get(course_code)
+        if guild_ids is not None:
+            guild_ids.discard(guild_id)
+            if not guild_ids:
+                del self.by_course[course_code]
+
+    def guilds_for(self, course_code):
+        return self.by_course.get(course_code, set())
+
+    def courses_for(self, user_id):
+        """回傳使用者追蹤的 [(guild_id, course_code), ...]，依課程代碼排序"""
+        return sorted(self.by_user.get(user_id, ()), key=lambda item: (item[1], item[0]))
+
+    def user_count(self, user_id):
+        return len(self.by_user.get(user_id, ()))
+
+    def snapshot(self):
+        """回傳 {course_code: (guild_id, ...)} 的複本，供輪詢在 await 期間安全使用"""
+        return {course_code: tuple(guild_ids) for course_code, guild_ids in self.by_course.items()}
+
+    def stats(self):
+        return {
+            "distinct_courses": len(self.by_course),
+            "subscriptions": sum(len(guild_ids) for guild_ids in self.by_course.values()),
+            "users": len(self.by_user),
+        }
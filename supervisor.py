@@ -0,0 +1,80 @@
+import asyncio
+import time
+from metrics import increment
+from utils import debug_print
+
+class Supervisor:
+    """
+    監看長時間執行的背景工作（輪詢、通知、歷史紀錄等）
+    工作因例外或意外返回而結束時，以指數退避重新啟動；
+    連續執行超過 healthy_after 秒後退避次數歸零
+    """
+
+    def __init__(self, tick=1.0, min_backoff=1.0, max_backoff=300.0, healthy_after=60.0):
+        self.tick = tick
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self.services = {}
+        self.stats = {"restarts": 0}
+
+    def add(self, name, factory):
+        """註冊並啟動工作，factory 為回傳 coroutine 的函式；同名工作已存在時不重複啟動"""
+        if name in self.services:
+            return
+        self.services[name] = {"factory": factory, "task": None, "failures": 0, "started_at": 0, "restart_at": None}
+        self._start(name)
+
+    def running(self, name):
+        service = self.services.get(name)
+        return bool(service and service["task"] and not service["task"].done())
+
+    def _start(self, name):
+        service = self.services[name]
+        service["task"] = asyncio.create_task(service["factory"](), name=name)
+        service["started_at"] = time.monotonic()
+        service["restart_at"] = None
+
+    def check(self):
+        now = time.monotonic()
+        for name, service in self.services.items():
+            task = service["task"]
+            if service["restart_at"] is not None:
+                if now >= service["restart_at"]:
+                    debug_print(f"♻️ 重新啟動背景工作 {name}")
+                    self.stats["restarts"] += 1
+                    increment("task_restarts_total", {"task": name})
+                    self._start(name)
+                continue
+            if not task.done():
+                continue
+
+            if task.cancelled():
+                reason = "已被取消"
+            elif task.exception():
+                error = task.exception()
+                reason = f"發生錯誤：{type(error).__name__}: {error}"
+            else:
+                reason = "意外結束"
+            if now - service["started_at"] >= self.healthy_after:
+                service["failures"] = 0
+            service["failures"] += 1
+            backoff = min(self.max_backoff, self.min_backoff * 2 ** (service["failures"] - 1))
+            service["restart_at"] = now + backoff
+            debug_print(f"❌ 背景工作 {name} {reason}，{backoff:.0f} 秒後重新啟動")
+
+    async def run(self):
+        debug_print("🩺 背景工作監看已啟動")
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                debug_print(f"❌ 檢查背景工作時發生錯誤：{type(e).__name__}: {e}")
+            await asyncio.sleep(self.tick)
+
+    async def close(self):
+        tasks = [service["task"] for service in self.services.values() if service["task"]]
+        self.services = {}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,119 @@
+"""
+course_parser 的單元測試：以 bench/fixtures/parser_fixtures.json 的每一筆文字驗證解析結果，
+並涵蓋樣式優先順序與上限合理範圍的邊界情況
+
+用法：
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from course_parser import parse_int, parse_enrolled, parse_remark_cap, parse_detail_cap
+
+FIXTURES = os.path.join(ROOT, "bench", "fixtures", "parser_fixtures.json")
+
+with open(FIXTURES, encoding="utf-8") as f:
+    fixtures = json.load(f)
+
+ENROLLMENT = {
+    "50 / 48": 48,
+    "60 / 60": 60,
+    "120 / 7": 7,
+    "30/0": 0,
+    "45 / 45 ": 45,
+    "": None,
+    "—": None,
+}
+
+REMARKS = {
+    "限40人": 40,
+    "／限40人": 40,
+    "限制30人；限本系": 30,
+    # 數字與「人」之間有空白時不視為人數上限
+    "上限 45 人": None,
+    "上限45人，額滿為止": 45,
+    "最多60人": 60,
+    "全英語授課；限外籍生20人": 20,
+    "本課程限大三以上修習": None,
+    "停開": None,
+    # 「限制」優先於「最多」，即使後者出現在後面
+    "限制12人，最多15人": 12,
+    "與CS3001301合開，共120人": 120,
+    "限本系大一新生，名額65人": 65,
+    # 沒有前綴的數字必須是兩到三位數
+    "1234人": None,
+    "課程人數上限請見選課系統": None,
+    # 低於合理範圍的上限不採用
+    "限4人": None,
+    "": None,
+    "英文授課(EMI)，限50人，請自備筆電。上課地點：TR-313，第一週停課": 50,
+}
+
+DIALOGS = {
+    "課程代碼：CS1001301\n課程名稱：計算機程式設計\n授課教師：王小明\n本校加退選人數上限：50\n外校加退選人數上限：5\n學分：3": 50,
+    # 「加退選人數上限」優先於「選課人數上限」
+    "課程代碼：EE2002301\n選課人數上限 (初選)：80\n加退選人數上限 (含外系)：90": 90,
+    "課程代碼：ME3003301\n人數上限：45\n教室：TR-313": 45,
+    "課程代碼：GE1004301\n備註：限40人": None,
+    # 本校加退選人數上限不做合理範圍檢查，即使為 0 也優先採用
+    "課程代碼：FL1005301\n本校加退選人數上限：0\n人數上限：30": 0,
+    "": None,
+}
+
+CASES = (
+    ("enrollment", parse_enrolled, ENROLLMENT),
+    ("remarks", parse_remark_cap, REMARKS),
+    ("dialogs", parse_detail_cap, DIALOGS),
+)
+
+@pytest.mark.parametrize("name, parse, expected", CASES, ids=[case[0] for case in CASES])
+def test_every_fixture_has_an_expectation(name, parse, expected):
+    assert set(fixtures[name]) == set(expected)
+
+@pytest.mark.parametrize("text", fixtures["enrollment"])
+def test_parse_enrolled(text):
+    assert parse_enrolled(text) == ENROLLMENT[text]
+
+@pytest.mark.parametrize("text", fixtures["remarks"])
+def test_parse_remark_cap(text):
+    assert parse_remark_cap(text) == REMARKS[text]
+
+@pytest.mark.parametrize("text", fixtures["dialogs"])
+def test_parse_detail_cap(text):
+    assert parse_detail_cap(text) == DIALOGS[text]
+
+@pytest.mark.parametrize("text, expected", [
+    ("限200人", 200),
+    ("限201人", None),
+    ("限5人", 5),
+    ("限12人，限制30人", 30),
+    ("最多15人，上限20人", 20),
+    ("共99人，最多40人", 40),
+])
+def test_parse_remark_cap_bounds_and_priority(text, expected):
+    assert parse_remark_cap(text) == expected
+
+@pytest.mark.parametrize("text, expected", [
+    ("上限：300\n人數上限：40", 40),
+    ("上限：300", None),
+    ("人數上限：40\n本校加退選人數上限：55", 55),
+])
+def test_parse_detail_cap_bounds_and_priority(text, expected):
+    assert parse_detail_cap(text) == expected
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("abc", None),
+    (45, 45),
+    ("45", 45),
+    ("上限 45 人", 45),
+])
+def test_parse_int(value, expected):
+    assert parse_int(value) == expected
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from collections import OrderedDict
+from utils import debug_print
+
+class UserNameCache:
+    """
+    使用者名稱快取，具有 TTL 與 LRU 淘汰
+    先查快取與 gateway 的成員/使用者快取，未命中的才以有限的併發數呼叫 fetch_user
+    """
+
+    def __init__(self, bot, ttl=3600, max_entries=5000, concurrency=5):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "gateway_hits": 0, "fetches": 0, "fetch_errors": 0}
+
+    def _get(self, user_id):
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return None
+        name, stored_at = entry
+        if time.monotonic() - stored_at >= self.ttl:
+            del self.entries[user_id]
+            return None
+        self.entries.move_to_end(user_id)
+        return name
+
+    def _put(self, user_id, name):
+        self.entries[user_id] = (name, time.monotonic())
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _from_gateway(self, user_id, guild=None):
+        member = guild.get_member(user_id) if guild else None
+        user = member or self.bot.get_user(user_id)
+        return user.name if user else None
+
+    async def _fetch(self, user_id, semaphore):
+        async with semaphore:
+            self.stats["fetches"] += 1
+            try:
+                user = await self.bot.fetch_user(user_id)
+                return user.name
+            except Exception as e:
+                self.stats["fetch_errors"] += 1
+                debug_print(f"⚠️ 取得使用者 {user_id} 失敗: {e}")
+                return None
+
+    async def resolve(self, user_ids, guild=None):
+        """回傳 {user_id: name}，無法取得名稱的使用者以 ID 表示"""
+        names = {}
+        missing = []
+        for user_id in set(user_ids):
+            name = self._get(user_id)
+            if name is not None:
+                self.stats["hits"] += 1
+                names[user_id] = name
+                continue
+            name = self._from_gateway(user_id, guild)
+            if name is not None:
+                self.stats["gateway_hits"] += 1
+                self._put(user_id, name)
+                names[user_id] = name
+                continue
+            missing.append(user_id)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            fetched = await asyncio.gather(*(self._fetch(user_id, semaphore) for user_id in missing))
+            for user_id, name in zip(missing, fetched):
+                if name is not None:
+                    self._put(user_id, name)
+                names[user_id] = name or str(user_id)
+        return names
@@ -0,0 +1,20 @@
+import datetime
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+# text 為一般輸出；json 每行輸出一個 JSON 物件，方便交給日誌系統收集
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+def debug_print(*args, **kwargs):
+    if DEBUG:
+        if LOG_FORMAT == "json":
+            message = kwargs.get("sep", " ").join(str(arg) for arg in args)
+            record = {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "level": "debug", "message": message}
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+            return
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] [DEBUG]", *args, **kwargs)
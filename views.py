@@ -0,0 +1,35 @@
+import discord
+
+class EmbedPaginator(discord.ui.View):
+    """以上一頁/下一頁按鈕切換多個 embed，只有下指令的使用者可以翻頁"""
+
+    def __init__(self, embeds, owner_id, timeout=180):
+        super().__init__(timeout=timeout)
+        self.embeds = embeds
+        self.owner_id = owner_id
+        self.index = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.embeds) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("⚠️ 只有下指令的使用者可以翻頁。", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
+
+    @discord.ui.button(label="◀ 上一頁", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="下一頁 ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = min(len(self.embeds) - 1, self.index + 1)
+        await self._show(interaction)